@@ -4,38 +4,79 @@
 #
 # /// script
 # requires-python = ">=3.12"
-# dependencies = [
-#     "requests",
-# ]
+# dependencies = []
 # ///
 import argparse
-import os
 import re
 import sys
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Tuple
 
-from .client import GitHubAPI, RequestResponse
+from .client import BoussoleError, GitHubAPI, RequestResponse
+from .queries import (
+    PREFETCH_QUERY,
+    VOTES_QUERY,
+    graphql_repository,
+    parse_check_runs,
+    parse_comments,
+    parse_permissions,
+    parse_reviews,
+    permissions_query,
+)
 
 from .messages import (  # isort:skip
-    APPROVED_TEMPLATE,
-    CANNOT_MERGE_OWN_PR,
-    CHECKS_NOT_PASSED,
-    COMMENTS_FETCH_ERROR,
-    HELP_TEXT,
-    INSUFFICIENT_PERMISSIONS,
-    LGTM_BREAKDOWN_TEMPLATE,
-    MERGE_FAILED,
-    NOT_ENOUGH_LGTM,
-    PERMISSION_CHECK_ERROR,
-    PERMISSION_DATA_MISSING,
-    SELF_APPROVAL_ERROR,
-    SUCCESS_MERGED,
-    CHERRY_PICK_ERROR,
-    CHERRY_PICK_SUCCESS,
-    CHERRY_PICK_CONFLICT,
-    REVIEW_REQUESTED,
+    render_approved,
+    render_cannot_merge_own_pr,
+    render_checks_not_passed,
+    render_cherry_pick_conflict,
+    render_cherry_pick_error,
+    render_cherry_pick_success,
+    render_comments_fetch_error,
+    render_insufficient_permissions,
+    render_lgtm_breakdown,
+    render_merge_failed,
+    render_not_enough_lgtm,
+    render_permission_check_error,
+    render_permission_data_missing,
+    render_review_requested,
+    render_self_approval_error,
+    render_success_merged,
 )
 
+# Upper bound of concurrent requests sent to the GitHub API for fan-out calls
+_MAX_WORKERS = 8
+
+# Largest page size accepted by the GitHub REST API for list endpoints
+_PER_PAGE = 100
+
+_LGTM_RE = re.compile(r"^/lgtm\b", re.IGNORECASE)
+_CHERRY_PICK_RE = re.compile(r"^/cherry-pick\s+(\S+)", re.IGNORECASE)
+# Page number of the rel="last" entry of a Link pagination header
+_LAST_PAGE_RE = re.compile(r'<[^>]*[?&]page=(\d+)[^>]*>;\s*rel="last"')
+
+# Markers used in the voters table for valid and invalid votes
+_VALID_MARK = "✅"
+_INVALID_MARK = "❌"
+
+
+class CommandError(BoussoleError):
+    """
+    Raised when a command cannot be run on the pull request.
+    """
+
+
+class LGTMError(BoussoleError):
+    """
+    Raised when the LGTM votes cannot be gathered or one of them is invalid.
+    """
+
+
+class MergeError(BoussoleError):
+    """
+    Raised when the pull request cannot be merged.
+    """
+
 
 class PRHandler:  # pylint: disable=too-many-instance-attributes
     """
@@ -49,87 +90,287 @@ class PRHandler:  # pylint: disable=too-many-instance-attributes
     ):
         self.api = api
         self.pr_num = args.pr_num
+        self.repo_owner = args.repo_owner
+        self.repo_name = args.repo_name
         self.pr_sender = args.pr_sender
         self.comment_sender = args.comment_sender
         self.lgtm_threshold = args.lgtm_threshold
-        self.lgtm_permissions = args.lgtm_permissions.split(",")
+        # Tolerate spaces around the commas, "admin, write" is a common spelling
+        self.lgtm_permissions = frozenset(
+            permission.strip()
+            for permission in args.lgtm_permissions.split(",")
+            if permission.strip()
+        )
+        self._lgtm_permissions_str = ", ".join(sorted(self.lgtm_permissions))
         self.lgtm_review_event = args.lgtm_review_event
         self.merge_method = args.merge_method
+        self.auto_merge = args.auto_merge
+        # Login the comments are posted as, None until looked up, "" if unknown
+        self.bot_login: Optional[str] = args.bot_login
 
         self._pr_status: RequestResponse | None = None
+        self._perm_cache: Dict[str, Tuple[Optional[str], bool]] = {}
+        self._comments_cache: Optional[List[Dict]] = None
+        self._reviews_cache: Optional[List[Dict]] = None
+        self._check_runs_cache: Optional[List[Dict]] = None
+        self._pr_json: Optional[Dict] = None
+        self._commits_cache: Dict[int, List[Dict]] = {}
+        # Query of the last successful prefetch, its results are in the caches
+        self._prefetched: Optional[str] = None
 
     def check_response(self, resp: RequestResponse) -> bool:
         """
         Checks the response status code and prints an error message if needed.
         """
-        if resp.getcode() >= 200 and resp.getcode() < 300:
+        status_code = resp.status_code
+        if 200 <= status_code < 300:
             return True
         print(
-            f"Error while executing the command: status: {resp.getcode()} {resp.read().decode()}",
+            f"Error while executing the command: status: {status_code} {resp.text}",
             file=sys.stderr,
         )
         return False
 
-    def _post_comment(self, message: str) -> RequestResponse:
+    def _get_bot_login(self) -> str:
         """
-        Posts a comment to the pull request.
+        Returns the login the comments are posted as, an empty string if unknown.
+
+        Taken from --bot-login, or else from the user owning the token. GitHub
+        App installation tokens cannot read /user, the login has to be
+        configured for them.
         """
+        if self.bot_login is None:
+            try:
+                response = self.api.get("https://api.github.com/user")
+            except BoussoleError:
+                response = None
+            self.bot_login = (
+                response.json().get("login", "")
+                if response and response.status_code == 200
+                else ""
+            )
+        return self.bot_login
+
+    def _post_comment(self, message: str) -> Optional[RequestResponse]:
+        """
+        Posts a comment to the pull request.
+
+        Nothing is posted when the latest comment of the bot is the same
+        message, as it happens when a pipeline run for the same trigger comment
+        is retried. This covers every command: the comments are fetched here
+        when no earlier step did. Without a known bot login every message is
+        posted.
+        """
+        if bot_login := self._get_bot_login():
+            try:
+                comments = self._get_comments()
+            except BoussoleError:
+                comments = []
+            latest = next(
+                (
+                    comment
+                    for comment in reversed(comments)
+                    if comment["user"]["login"] == bot_login
+                ),
+                None,
+            )
+            if latest and latest.get("body", "").strip() == message.strip():
+                print("ℹ️ Skipping comment identical to the latest one of the bot.")
+                return None
         endpoint = f"issues/{self.pr_num}/comments"
         return self.api.post(endpoint, {"body": message})
 
-    def _fetch_and_validate_lgtm_votes(self) -> Tuple[int, Dict[str, Optional[str]]]:
+    def _get_all_pages(self, endpoint: str) -> Tuple[RequestResponse, List[Dict]]:
+        """
+        Fetches every page of a paginated list endpoint.
+
+        GitHub returns 30 items per page by default, which silently truncates
+        busy pull requests. Pages of _PER_PAGE items are requested until a
+        short one comes back. When the first page announces the last one in
+        its Link header, the remaining pages are fetched concurrently. The last
+        response is returned with the items so callers can report errors.
+        """
+        items: List[Dict] = []
+        page = 1
+        while True:
+            response = self.api.get(f"{endpoint}?per_page={_PER_PAGE}&page={page}")
+            if response.status_code != 200:
+                return response, items
+            batch = response.json()
+            items.extend(batch)
+            if len(batch) < _PER_PAGE:
+                return response, items
+            page += 1
+
+            last_page = _LAST_PAGE_RE.search(response.getheader("Link") or "")
+            if page == 2 and last_page and int(last_page.group(1)) > 2:
+                urls = [
+                    f"{endpoint}?per_page={_PER_PAGE}&page={number}"
+                    for number in range(2, int(last_page.group(1)) + 1)
+                ]
+                with ThreadPoolExecutor(
+                    max_workers=min(_MAX_WORKERS, len(urls))
+                ) as executor:
+                    responses = list(executor.map(self.api.get, urls))
+                for response in responses:
+                    if response.status_code != 200:
+                        return response, items
+                    items.extend(response.json())
+                return response, items
+
+    def _get_comments(self) -> List[Dict]:
+        """
+        Fetches the comments of the pull request.
+
+        The comments are fetched once and reused for the lifetime of the handler.
+        """
+        if self._comments_cache is not None:
+            return self._comments_cache
+
+        response, comments = self._get_all_pages(f"issues/{self.pr_num}/comments")
+        if response.status_code != 200:
+            error_message = render_comments_fetch_error(
+                status_code=response.status_code,
+                response_text=response.text,
+                pr_num=self.pr_num,
+            )
+            raise LGTMError(error_message)
+        self._comments_cache = comments
+        return self._comments_cache
+
+    def _get_reviews(self) -> List[Dict]:
         """
-        Fetches LGTM votes and validates them.
+        Fetches the reviews of the pull request.
 
-        Returns the number of valid votes and a dictionary of users with their
-        permissions.
+        The reviews are fetched once and reused for the lifetime of the handler.
         """
-        reviews_endpoint = f"pulls/{self.pr_num}/reviews"
-        reviews_response = self.api.get(reviews_endpoint)
+        if self._reviews_cache is not None:
+            return self._reviews_cache
+
+        reviews_response, reviews = self._get_all_pages(f"pulls/{self.pr_num}/reviews")
         if reviews_response.status_code != 200:
-            error_message = COMMENTS_FETCH_ERROR.format(
+            error_message = render_comments_fetch_error(
                 status_code=reviews_response.status_code,
                 response_text=reviews_response.text,
                 pr_num=self.pr_num,
             )
-            print(error_message, file=sys.stderr)
-            sys.exit(1)
+            raise LGTMError(error_message)
+        self._reviews_cache = reviews
+        return self._reviews_cache
 
+    def _graphql_prefetch(self, query: str = PREFETCH_QUERY) -> bool:
+        """
+        Prefetches reviews, comments, check runs and collaborator permissions.
+
+        A single GraphQL query replaces the REST calls made on the merge path,
+        the results are stored in the handler caches. Anything truncated by
+        pagination is left out so the REST fallback fetches it in full. Parts
+        not selected by the query, as with VOTES_QUERY, are left to REST too.
+
+        Returns True if the prefetch succeeded. Nothing is sent again once
+        the same query, or PREFETCH_QUERY which selects everything, succeeded.
+        """
+        if self._prefetched in (query, PREFETCH_QUERY):
+            return True
+        try:
+            response = self.api.graphql(
+                query,
+                {
+                    "owner": self.repo_owner,
+                    "name": self.repo_name,
+                    "number": int(self.pr_num),
+                },
+            )
+        except BoussoleError:
+            return False
+        repository = graphql_repository(response)
+        if not repository or not repository.get("pullRequest"):
+            return False
+        pull_request = repository["pullRequest"]
+
+        # Truncated parts come back as None, the REST fallback fetches them
+        if (reviews := parse_reviews(pull_request["reviews"])) is not None:
+            self._reviews_cache = reviews
+        if (comments := parse_comments(pull_request["comments"])) is not None:
+            self._comments_cache = comments
+        if "commits" in pull_request:
+            check_runs = parse_check_runs(pull_request["commits"]["nodes"])
+            if check_runs is not None:
+                self._check_runs_cache = check_runs
+
+        for login, permission in parse_permissions(repository.get("collaborators")):
+            self._perm_cache[login] = (permission, permission in self.lgtm_permissions)
+        self._prefetched = query
+        return True
+
+    def _graphql_permissions(self, users: List[str]) -> None:
+        """
+        Looks up the permissions of several users in a single GraphQL request.
+
+        The permissions found are stored in the permission cache, users left
+        out are looked up one by one through REST by _check_membership.
+        """
+        variables: Dict = {"owner": self.repo_owner, "name": self.repo_name}
+        variables.update({f"u{i}": user for i, user in enumerate(users)})
+        try:
+            response = self.api.graphql(permissions_query(len(users)), variables)
+        except BoussoleError:
+            return
+        repository = graphql_repository(response) or {}
+
+        for i, user in enumerate(users):
+            # The collaborators query matches substrings, keep the exact login
+            for login, permission in parse_permissions(repository.get(f"u{i}")):
+                if login.lower() == user.lower():
+                    self._perm_cache[user] = (
+                        permission,
+                        permission in self.lgtm_permissions,
+                    )
+                    break
+
+    def _fetch_and_validate_lgtm_votes(self) -> Tuple[int, Dict[str, Optional[str]]]:
+        """
+        Fetches LGTM votes and validates them.
+
+        Every voter permission is looked up, even when the threshold cannot be
+        reached: the count and the table are posted back to the PR.
+
+        Returns the number of valid votes and a dictionary of users with their
+        permissions.
+        """
         lgtm_users: Dict[str, Optional[str]] = {}
-        reviews = reviews_response.json()
-        for review in reviews:
+        for review in self._get_reviews():
             if review["state"].lower() == "approved":
                 user = review["user"]["login"]
                 if user != self.pr_sender:  # Skip self-approvals
                     lgtm_users[user] = None
 
-        endpoint = f"issues/{self.pr_num}/comments"
-        response = self.api.get(endpoint)
-        if response.status_code != 200:
-            error_message = COMMENTS_FETCH_ERROR.format(
-                status_code=response.status_code,
-                response_text=response.text,
-                pr_num=self.pr_num,
-            )
-            print(error_message, file=sys.stderr)
-            sys.exit(1)
-        comments = response.json()
-        for comment in comments:
+        for comment in self._get_comments():
             body = comment.get("body", "")
-            if re.search(r"^/lgtm\b", body, re.IGNORECASE):
+            # Cheap prefix check first, most comments are plain discussion
+            if body[:5].lower() == "/lgtm" and _LGTM_RE.match(body):
                 user = comment["user"]["login"]
                 if user == self.pr_sender:
-                    msg = SELF_APPROVAL_ERROR.format(
+                    msg = render_self_approval_error(
                         user=user, comment_url=comment["html_url"]
                     )
                     self._post_comment(msg)
-                    print(msg, file=sys.stderr)
-                    sys.exit(1)
+                    raise LGTMError(msg)
                 lgtm_users[user] = None
 
+        users = list(lgtm_users)
+        unknown = [user for user in users if user not in self._perm_cache]
+        if len(unknown) > 1:
+            self._graphql_permissions(unknown)
+
+        # Remaining permission lookups are independent, run them concurrently
+        with ThreadPoolExecutor(
+            max_workers=min(_MAX_WORKERS, len(users) or 1)
+        ) as executor:
+            results = list(executor.map(self._check_membership, users))
+
         valid_votes = 0
-        for user in lgtm_users:
-            permission, is_valid = self._check_membership(user)
+        for user, (permission, is_valid) in zip(users, results):
             lgtm_users[user] = permission
             if is_valid:
                 valid_votes += 1
@@ -139,6 +380,16 @@ class PRHandler:  # pylint: disable=too-many-instance-attributes
     def _check_membership(self, user: str) -> Tuple[Optional[str], bool]:
         """
         Checks if a user has the required permissions.
+
+        Results are cached per user for the lifetime of the handler.
+        """
+        if user not in self._perm_cache:
+            self._perm_cache[user] = self._fetch_membership(user)
+        return self._perm_cache[user]
+
+    def _fetch_membership(self, user: str) -> Tuple[Optional[str], bool]:
+        """
+        Fetches the permission of a user from the GitHub API.
         """
         endpoint = f"collaborators/{user}/permission"
         response = self.api.get(endpoint)
@@ -146,7 +397,7 @@ class PRHandler:  # pylint: disable=too-many-instance-attributes
             return None, False
         if response.status_code != 200:
             print(
-                PERMISSION_CHECK_ERROR.format(
+                render_permission_check_error(
                     user=user, status_code=response.status_code
                 ),
                 file=sys.stderr,
@@ -156,7 +407,7 @@ class PRHandler:  # pylint: disable=too-many-instance-attributes
         permission = response.json().get("permission")
         if not permission:
             print(
-                PERMISSION_DATA_MISSING.format(user=user),
+                render_permission_data_missing(user=user),
                 file=sys.stderr,
             )
             return None, False
@@ -166,12 +417,30 @@ class PRHandler:  # pylint: disable=too-many-instance-attributes
     def _get_pr_commits(self, pr_num: int) -> List[Dict]:
         """
         Fetches all commits from a pull request.
+
+        Successful fetches are cached so several cherry-picks share them.
         """
-        endpoint = f"pulls/{pr_num}/commits"
-        response = self.api.get(endpoint)
+        if pr_num in self._commits_cache:
+            return self._commits_cache[pr_num]
+        response, commits = self._get_all_pages(f"pulls/{pr_num}/commits")
         if response.status_code != 200:
             return []
-        return response.json()
+        self._commits_cache[pr_num] = commits
+        return commits
+
+    def _format_users_table(self, lgtm_users: Dict[str, Optional[str]]) -> str:
+        """
+        Formats the markdown table rows listing the voters and their permissions.
+
+        Bot accounts are left out of the table.
+        """
+        rows = [
+            f"| @{user} | `{permission or 'none'}` | "
+            f"{_VALID_MARK if permission in self.lgtm_permissions else _INVALID_MARK} |\n"
+            for user, permission in lgtm_users.items()
+            if "[bot]" not in user
+        ]
+        return "".join(rows)
 
     def _post_lgtm_breakdown(
         self, valid_votes: int, lgtm_users: Dict[str, Optional[str]]
@@ -179,18 +448,11 @@ class PRHandler:  # pylint: disable=too-many-instance-attributes
         """
         Posts a detailed breakdown of LGTM votes.
         """
-        users_table = ""
-        for user, permission in lgtm_users.items():
-            is_valid = permission in self.lgtm_permissions
-            if "[bot]" in user:
-                continue
-            valid_mark = "✅" if is_valid else "❌"
-            users_table += f"| @{user} | `{permission or 'none'}` | {valid_mark} |\n"
 
-        message = LGTM_BREAKDOWN_TEMPLATE.format(
+        message = render_lgtm_breakdown(
             valid_votes=valid_votes,
             threshold=self.lgtm_threshold,
-            users_table=users_table,
+            users_table=self._format_users_table(lgtm_users),
         )
         self._post_comment(message)
 
@@ -225,44 +487,77 @@ class PRHandler:  # pylint: disable=too-many-instance-attributes
         self._pr_status = self.api.get(endpoint)
         return self._pr_status
 
-    def _check_runs_status(self) -> Tuple[bool, List[Dict]]:
+    def _pr_info(self) -> Dict:
         """
-        Checks if all check runs are successful.
-
-        Returns a tuple of (all_success, failed_checks).
+        Returns the parsed pull request payload, parsed once per handler.
         """
-        endpoint = f"commits/{self._get_pr_status(self.pr_num).json()['head']['sha']}/check-runs"
-        headers = {"Accept": "application/vnd.github.v3+json"}
-        headers.update(self.api.headers)
+        if self._pr_json is None:
+            self._pr_json = self._get_pr_status(self.pr_num).json()
+        return self._pr_json
 
-        response = self.api.get(endpoint)
-        if response.status_code != 200:
-            return False, []
+    def _head_sha(self) -> str:
+        """
+        Returns the SHA of the head commit of the pull request.
+        """
+        return self._pr_info()["head"]["sha"]
 
-        check_runs = response.json()["check_runs"]
+    def _base_ref(self) -> str:
+        """
+        Returns the name of the branch the pull request targets.
+        """
+        return self._pr_info()["base"]["ref"]
 
-        failed_checks = [
-            {
-                "name": check["name"],
-                "status": check["status"],
-                "conclusion": check["conclusion"],
-                "html_url": check["html_url"],
-            }
-            for check in check_runs
-            if check["status"] == "completed"
-            and check["conclusion"] not in ["success", "skipped"]
-        ]
+    def _check_runs_status(self) -> Tuple[bool, List[Dict]]:
+        """
+        Checks if all check runs are successful.
 
-        pending_checks = [
-            {
-                "name": check["name"],
-                "status": check["status"],
-                "html_url": check.get("html_url", ""),
-            }
-            for check in check_runs
-            if check["status"] != "completed"
-            and not check["name"].endswith(" / boussole")
-        ]
+        Returns a tuple of (all_success, failed_checks).
+        """
+        if self._check_runs_cache is not None:
+            check_runs = self._check_runs_cache
+        else:
+            # Page until every run is listed, a missing run could be failing
+            endpoint = f"commits/{self._head_sha()}/check-runs?per_page={_PER_PAGE}"
+            check_runs = []
+            page = 1
+            while True:
+                response = self.api.get(
+                    endpoint if page == 1 else f"{endpoint}&page={page}"
+                )
+                if response.status_code != 200:
+                    return False, []
+                payload = response.json()
+                check_runs.extend(payload["check_runs"])
+                if len(check_runs) >= payload["total_count"]:
+                    break
+                if not payload["check_runs"]:
+                    # Runs announced but not listed, do not merge blindly
+                    return False, []
+                page += 1
+
+        failed_checks = []
+        pending_checks = []
+        for check in check_runs:
+            status = check["status"]
+            if status == "completed":
+                conclusion = check["conclusion"]
+                if conclusion not in ("success", "skipped"):
+                    failed_checks.append(
+                        {
+                            "name": check["name"],
+                            "status": status,
+                            "conclusion": conclusion,
+                            "html_url": check["html_url"],
+                        }
+                    )
+            elif not (name := check["name"]).endswith(" / boussole"):
+                pending_checks.append(
+                    {
+                        "name": name,
+                        "status": status,
+                        "html_url": check.get("html_url", ""),
+                    }
+                )
 
         all_success = not (failed_checks or pending_checks)
         return all_success, failed_checks + pending_checks
@@ -270,11 +565,9 @@ class PRHandler:  # pylint: disable=too-many-instance-attributes
     def check_status(self, num: int, status: str) -> bool:
         pr_status = self._get_pr_status(num)
         if pr_status.status_code != 200:
-            print(
-                f"⚠️ Unable to fetch PR status for PR #{num}: {pr_status.text}",
-                file=sys.stderr,
+            raise CommandError(
+                f"⚠️ Unable to fetch PR status for PR #{num}: {pr_status.text}"
             )
-            sys.exit(1)
         return pr_status.json().get("state") == status
 
     def assign_unassign(self, command: str, users: List[str]) -> RequestResponse:
@@ -290,24 +583,23 @@ class PRHandler:  # pylint: disable=too-many-instance-attributes
         """
         endpoint = f"pulls/{self.pr_num}/requested_reviewers"
         users = [user.lstrip("@") for user in users]
+        # The PR author cannot review their own PR, refuse before calling GitHub
+        if self.pr_sender in users:
+            self._post_comment(
+                message := render_cannot_merge_own_pr(pr_sender=self.pr_sender)
+            )
+            raise CommandError(message)
+
         data = {"reviewers": users}
         method = self.api.post if command == "assign" else self.api.delete
         response = method(endpoint, data)
 
-        for user in users:
-            if user == self.pr_sender:
-                self._post_comment(
-                    message := CANNOT_MERGE_OWN_PR.format(pr_sender=self.pr_sender)
-                )
-                print(message, file=sys.stderr)
-                sys.exit(1)
-
         if response and response.status_code in [200, 201, 204]:
             if command == "assign":
                 # Create a friendly message for assignments
                 greeting = "👋 Hello " + ", ".join([f"@{user}" for user in users])
                 submitter = self.comment_sender
-                message = REVIEW_REQUESTED.format(
+                message = render_review_requested(
                     greeting=greeting, submitter=submitter
                 )
             else:
@@ -324,27 +616,57 @@ class PRHandler:  # pylint: disable=too-many-instance-attributes
         """
         endpoint = f"issues/{self.pr_num}/labels"
         data = {"labels": labels}
-        self._post_comment(f"✅ Added labels: <b>{', '.join(labels)}</b>.")
-        return self.api.post(endpoint, data)
+        response = self.api.post(endpoint, data)
+        # Only confirm once GitHub has actually added the labels
+        if response and response.status_code in [200, 201]:
+            self._post_comment(f"✅ Added labels: <b>{', '.join(labels)}</b>.")
+        return response
 
-    def unlabel(self, labels: List[str]) -> RequestResponse:
+    def _remove_label(self, label: str) -> Optional[str]:
+        """
+        Removes a single label from the PR.
+
+        Returns the error message if the label could not be removed.
+        """
+        endpoint = f"issues/{self.pr_num}/labels/{urllib.parse.quote(label, safe='')}"
+        try:
+            self.api.delete(endpoint)
+        except BoussoleError as e:
+            return f"{label} ({e})"
+        return None
+
+    def unlabel(self, labels: List[str]) -> Optional[RequestResponse]:
         """
         Removes labels from the PR.
+
+        Only the labels actually removed are reported in the comment, an error
+        listing the others is raised afterwards.
         """
-        for label in labels:
-            self.api.delete(f"issues/{self.pr_num}/labels/{label}")
-        return self._post_comment(f"✅ Removed labels: <b>{', '.join(labels)}</b>.")
+        # Each label is removed with its own DELETE, send them concurrently
+        with ThreadPoolExecutor(
+            max_workers=min(_MAX_WORKERS, len(labels) or 1)
+        ) as executor:
+            errors = list(executor.map(self._remove_label, labels))
+
+        response = None
+        removed = [label for label, error in zip(labels, errors) if error is None]
+        if removed:
+            response = self._post_comment(
+                f"✅ Removed labels: <b>{', '.join(removed)}</b>."
+            )
+        failed = [error for error in errors if error]
+        if failed:
+            raise CommandError(f"⚠️ Could not remove labels: {', '.join(failed)}")
+        return response
 
     def cherry_pick(self, values: List[str]) -> None:
         """
         Posts a comment indicating the PR will be cherry-picked to the specified branch.
         """
         if len(values) != 1:
-            print(
-                f"⚠️ Invalid number of arguments for cherry-pick: {values}",
-                file=sys.stderr,
+            raise CommandError(
+                f"⚠️ Invalid number of arguments for cherry-pick: {values}"
             )
-            sys.exit(1)
 
         target_branch = values[0]
         self._post_comment(
@@ -353,92 +675,82 @@ class PRHandler:  # pylint: disable=too-many-instance-attributes
 
     def rebase(self) -> RequestResponse:
         endpoint = f"pulls/{self.pr_num}/update-branch"
-        self._post_comment("✅ Rebased the PR branch on the base branch.")
-        return self.api.put(endpoint, {})
+        response = self.api.put(endpoint, {})
+        # Only confirm once GitHub has accepted the update, conflicts are refused
+        if response and 200 <= response.status_code < 300:
+            self._post_comment("✅ Rebased the PR branch on the base branch.")
+        return response
 
     def lgtm(self, send_comment: bool = True) -> int:
         """
         Processes LGTM votes and approves the PR if the threshold is met.
 
-        Includes both comment-based LGTM and direct PR approvals.
+        Includes both comment-based LGTM and direct PR approvals. With
+        auto_merge the PR is then merged in the same run, merge_pr finds the
+        votes and permissions in the caches.
         """
-        # First check direct PR approvals
+        # Only the votes are needed here unless merging, fetch them with one query
+        self._graphql_prefetch(PREFETCH_QUERY if self.auto_merge else VOTES_QUERY)
+
+        # Approving reviews and /lgtm comments share the same validation path
         valid_votes, lgtm_users = self._fetch_and_validate_lgtm_votes()
         if valid_votes >= self.lgtm_threshold:
-            users_table = ""
-            for user, permission in lgtm_users.items():
-                is_valid = permission in self.lgtm_permissions
-                if "bot" in user:
-                    continue
-                valid_mark = "✅" if is_valid else "❌"
-                users_table += (
-                    f"| @{user} | `{permission or 'none'}` | {valid_mark} |\n"
-                )
             endpoint = f"pulls/{self.pr_num}/reviews"
-            body = APPROVED_TEMPLATE.format(
+            body = render_approved(
                 pr_sender=self.pr_sender,
                 threshold=self.lgtm_threshold,
                 valid_votes=valid_votes,
-                users_table=users_table,
+                users_table=self._format_users_table(lgtm_users),
             )
             data = {"event": self.lgtm_review_event, "body": body}
             print("✅ PR approved with LGTM votes.")
             self.api.post(endpoint, data)
+            if self.auto_merge:
+                # Anyone can comment /lgtm, the votes authorize the merge
+                self.merge_pr(approved=True)
             return valid_votes
 
-        message = NOT_ENOUGH_LGTM.format(
+        message = render_not_enough_lgtm(
             valid_votes=valid_votes, threshold=self.lgtm_threshold
         )
         print(message)
         if send_comment:
             self._post_lgtm_breakdown(valid_votes, lgtm_users)
-        sys.exit(0)
+        return valid_votes
 
-    def merge_pr(self, custom_merge_method: Optional[str] = None) -> bool:
+    def merge_pr(
+        self, custom_merge_method: Optional[str] = None, approved: bool = False
+    ) -> bool:
         """
         Merges the PR if it has enough LGTM approvals and all checks are green.
 
         Args:
             custom_merge_method: If provided, overrides the default merge method.
                                 Must be one of: 'merge', 'squash', or 'rebase'.
+            approved: Set by lgtm in auto-merge mode, the validated votes then
+                      authorize the merge whatever the permission of the
+                      commenter.
         """
+        # Collapse the REST calls below into one GraphQL request when possible
+        self._graphql_prefetch()
+
         # Check if the user has sufficient permissions to merge
-        permission, is_valid = self._check_membership(self.comment_sender)
+        permission, is_valid = None, True
+        if not approved:
+            permission, is_valid = self._check_membership(self.comment_sender)
         if not is_valid:
-            msg = INSUFFICIENT_PERMISSIONS.format(
+            msg = render_insufficient_permissions(
                 user=self.comment_sender,
                 permission=permission,
-                required_permissions=", ".join(self.lgtm_permissions),
+                required_permissions=self._lgtm_permissions_str,
             )
             self._post_comment(msg)
-            print(msg, file=sys.stderr)
-            sys.exit(1)
-
-        # Check if all check runs are green
-        all_checks_passed, failed_checks = self._check_runs_status()
-        if not all_checks_passed:
-            status_table = "\n| Check Name | Status |\n|------------|--------|\n"
-            for check in failed_checks:
-                status = check.get("conclusion", check["status"])
-                check_name = check["name"]
-                # Add the URL link if available in the check data
-                if "html_url" in check:
-                    check_name = f"[{check['name']}]({check['html_url']})"
-                status_table += f"| {check_name} | `{status}` |\n"
-
-            msg = (
-                "⚠️ Cannot merge PR: Some checks are not passing.\n\n"
-                f"{status_table}\n\n"
-                "Please wait for all checks to pass before merging."
-            )
-            self._post_comment(CHECKS_NOT_PASSED.format(status_table=status_table))
-            print(msg, file=sys.stderr)
-            sys.exit(1)
+            raise MergeError(msg)
 
-        # Fetch LGTM votes
+        # Fetch LGTM votes, the merger may bring the last missing one
         valid_votes, lgtm_users = self._fetch_and_validate_lgtm_votes()
         # Handle case where admin/write user can merge directly
-        if self.pr_sender not in self.comment_sender and permission in [
+        if self.comment_sender != self.pr_sender and permission in [
             "admin",
             "write",
         ]:
@@ -453,6 +765,27 @@ class PRHandler:  # pylint: disable=too-many-instance-attributes
                     lgtm_users[self.comment_sender] = permission
                     valid_votes += 1
         if valid_votes >= self.lgtm_threshold:
+            # Only query the check runs once enough votes have been gathered
+            all_checks_passed, failed_checks = self._check_runs_status()
+            if not all_checks_passed:
+                rows = ["\n| Check Name | Status |\n|------------|--------|\n"]
+                for check in failed_checks:
+                    status = check.get("conclusion", check["status"])
+                    check_name = check["name"]
+                    # Add the URL link if available in the check data
+                    if "html_url" in check:
+                        check_name = f"[{check_name}]({check['html_url']})"
+                    rows.append(f"| {check_name} | `{status}` |\n")
+                status_table = "".join(rows)
+
+                msg = (
+                    "⚠️ Cannot merge PR: Some checks are not passing.\n\n"
+                    f"{status_table}\n\n"
+                    "Please wait for all checks to pass before merging."
+                )
+                self._post_comment(render_checks_not_passed(status_table=status_table))
+                raise MergeError(msg)
+
             endpoint = f"pulls/{self.pr_num}/merge"
 
             # Use custom merge method if provided and valid, otherwise use default
@@ -471,52 +804,45 @@ class PRHandler:  # pylint: disable=too-many-instance-attributes
             }
             response = self.api.put(endpoint, data)
             if response and response.status_code == 200:
-                # Fetch all comments to find cherry-pick commands
-                comments_response = self.api.get(f"issues/{self.pr_num}/comments")
-                if comments_response.status_code != 200:
-                    print(
-                        f"⚠️ Unable to fetch comments for PR #{self.pr_num}: {comments_response.text}",
-                        file=sys.stderr,
-                    )
-                    sys.exit(1)
-
-                comments = comments_response.json()
+                # Reuse the comments fetched for the LGTM votes to find cherry-pick commands
                 cherry_pick_branches = set()
-                for comment in comments:
+                for comment in self._get_comments():
                     body = comment.get("body", "")
-                    match = re.match(r"^/cherry-pick\s+(\S+)", body, re.IGNORECASE)
+                    if body[:12].lower() != "/cherry-pick":
+                        continue
+                    match = _CHERRY_PICK_RE.match(body)
                     if match:
                         cherry_pick_branches.add(match.group(1))
 
-                # Perform cherry-picks to the specified branches
-                for target_branch in cherry_pick_branches:
-                    if not self._perform_cherry_pick(target_branch):
+                # Perform cherry-picks to the specified branches, each branch is
+                # independent so they run concurrently
+                if cherry_pick_branches:
+                    # Warm the commits cache so the branches do not all fetch it
+                    self._get_pr_commits(self.pr_num)
+                    with ThreadPoolExecutor(
+                        max_workers=min(_MAX_WORKERS, len(cherry_pick_branches))
+                    ) as executor:
+                        results = list(
+                            executor.map(
+                                self._perform_cherry_pick, cherry_pick_branches
+                            )
+                        )
+                    if not all(results):
                         return False
 
-                # Create the users table for the success message
-                users_table = ""
-                for user, permission in lgtm_users.items():
-                    is_valid = permission in self.lgtm_permissions
-                    if "[bot]" in user:
-                        continue
-                    valid_mark = "✅" if is_valid else "❌"
-                    users_table += (
-                        f"| @{user} | `{permission or 'unknown'}` | {valid_mark} |\n"
-                    )
-
-                success_message = SUCCESS_MERGED.format(
+                success_message = render_success_merged(
                     pr_sender=self.pr_sender,
                     merge_method=merge_method,
                     comment_sender=self.comment_sender,
                     valid_votes=valid_votes,
                     lgtm_threshold=self.lgtm_threshold,
-                    users_table=users_table,
+                    users_table=self._format_users_table(lgtm_users),
                 )
                 self._post_comment(success_message)
                 return True
 
             self._post_comment(
-                MERGE_FAILED.format(
+                render_merge_failed(
                     pr_num=self.pr_num,
                     status_code=response.status_code,
                     error_text=response.text,
@@ -525,7 +851,7 @@ class PRHandler:  # pylint: disable=too-many-instance-attributes
             return False
 
         self._post_comment(
-            NOT_ENOUGH_LGTM.format(
+            render_not_enough_lgtm(
                 valid_votes=valid_votes, threshold=self.lgtm_threshold
             ),
         )
@@ -535,11 +861,15 @@ class PRHandler:  # pylint: disable=too-many-instance-attributes
         """
         Performs cherry-pick operation to the specified branch.
         """
-        # Get all PR commits in chronological order
-        commits = self._get_pr_commits(self.pr_num)
+        # Get all PR commits in chronological order and look up the target
+        # branch at the same time, the two requests are independent
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            commits_future = executor.submit(self._get_pr_commits, self.pr_num)
+            branch_sha_future = executor.submit(self._get_branch_sha, target_branch)
+        commits = commits_future.result()
         if not commits:
             self._post_comment(
-                CHERRY_PICK_ERROR.format(
+                render_cherry_pick_error(
                     source_pr=self.pr_num,
                     target_branch=target_branch,
                     status_code="404",
@@ -549,16 +879,15 @@ class PRHandler:  # pylint: disable=too-many-instance-attributes
             return False
 
         # Check if target branch exists
-        current_sha = self._get_branch_sha(target_branch)
+        current_sha = branch_sha_future.result()
         if not current_sha:
             # Handle new branch creation
-            pr_info = self._get_pr_status(self.pr_num).json()
-            base_branch = pr_info["base"]["ref"]
+            base_branch = self._base_ref()
             base_sha = self._get_branch_sha(base_branch)
 
             if not base_sha:
                 self._post_comment(
-                    CHERRY_PICK_ERROR.format(
+                    render_cherry_pick_error(
                         source_pr=self.pr_num,
                         target_branch=target_branch,
                         status_code="404",
@@ -569,7 +898,7 @@ class PRHandler:  # pylint: disable=too-many-instance-attributes
 
             if not self._create_branch(target_branch, base_sha):
                 self._post_comment(
-                    CHERRY_PICK_ERROR.format(
+                    render_cherry_pick_error(
                         source_pr=self.pr_num,
                         target_branch=target_branch,
                         status_code="422",
@@ -604,7 +933,7 @@ class PRHandler:  # pylint: disable=too-many-instance-attributes
 
             if response.status_code != 201:
                 self._post_comment(
-                    CHERRY_PICK_ERROR.format(
+                    render_cherry_pick_error(
                         source_pr=self.pr_num,
                         target_branch=target_branch,
                         status_code=response.status_code,
@@ -618,7 +947,7 @@ class PRHandler:  # pylint: disable=too-many-instance-attributes
 
         # All commits successfully cherry-picked
         self._post_comment(
-            CHERRY_PICK_SUCCESS.format(
+            render_cherry_pick_success(
                 source_pr=self.pr_num,
                 target_branch=target_branch,
                 user=self.comment_sender,
@@ -639,7 +968,7 @@ class PRHandler:  # pylint: disable=too-many-instance-attributes
 
         Posts detailed information and instructions for manual resolution.
         """
-        conflict_message = CHERRY_PICK_CONFLICT.format(
+        conflict_message = render_cherry_pick_conflict(
             pr_num=self.pr_num,
             target_branch=target_branch,
             current_commit=current_commit,
@@ -647,187 +976,3 @@ class PRHandler:  # pylint: disable=too-many-instance-attributes
             commit_sha=commit_sha,
         )
         self._post_comment(conflict_message)
-
-
-def parse_args() -> argparse.Namespace:
-    parser = argparse.ArgumentParser(
-        description="Manage prow-like commands on a GitHub PullRequest.",
-        formatter_class=argparse.ArgumentDefaultsHelpFormatter,  # Show default values in help
-    )
-    # LGTM threshold argument
-    parser.add_argument(
-        "--lgtm-threshold",
-        default=int(os.getenv("PAC_LGTM_THRESHOLD", "1")),  # Default as string
-        type=int,
-        help="Minimum number of LGTM approvals required to merge a PR. "
-        "Can be overridden via the PAC_LGTM_THRESHOLD environment variable.",
-    )
-    # LGTM permissions argument
-    parser.add_argument(
-        "--lgtm-permissions",
-        default=os.getenv("PAC_LGTM_PERMISSIONS", "admin,write"),
-        help="Comma-separated list of GitHub permissions required to give a valid LGTM. "
-        "Can be overridden via the PAC_LGTM_PERMISSIONS environment variable.",
-    )
-    # LGTM review event argument
-    parser.add_argument(
-        "--lgtm-review-event",
-        default=os.getenv("PAC_LGTM_REVIEW_EVENT", "APPROVE"),
-        help="The type of review event to trigger when an LGTM is given. "
-        "Can be overridden via the PAC_LGTM_REVIEW_EVENT environment variable.",
-    )
-
-    # Merge method argument
-    parser.add_argument(
-        "--merge-method",
-        default=os.getenv("GH_MERGE_METHOD", "rebase"),
-        help="The method to use when merging the pull request. "
-        "Options: 'merge', 'rebase', or 'squash'. "
-        "Can be overridden via the GH_MERGE_METHOD environment variable.",
-    )
-    # GitHub token argument
-    parser.add_argument(
-        "--github-token",
-        default=os.getenv("GITHUB_TOKEN"),
-        help="GitHub API token for authentication. "
-        "Required if the GITHUB_TOKEN environment variable is not set.",
-    )
-    # PR number argument
-    parser.add_argument(
-        "--pr-num",
-        default=os.getenv("GH_PR_NUM"),
-        help="The number of the pull request to operate on. "
-        "Can be overridden via the GH_PR_NUM environment variable.",
-    )
-
-    # PR sender argument
-    parser.add_argument(
-        "--pr-sender",
-        default=os.getenv("GH_PR_SENDER"),
-        help="The GitHub username of the user who opened the pull request. "
-        "Can be overridden via the GH_PR_SENDER environment variable.",
-    )
-
-    # Comment sender argument
-    parser.add_argument(
-        "--comment-sender",
-        default=os.getenv("GH_COMMENT_SENDER"),
-        help="The GitHub username of the user who triggered the command. "
-        "Can be overridden via the GH_COMMENT_SENDER environment variable.",
-    )
-
-    # Repository owner argument
-    parser.add_argument(
-        "--repo-owner",
-        default=os.getenv("GH_REPO_OWNER"),
-        help="The owner (organization or user) of the GitHub repository. "
-        "Can be overridden via the GH_REPO_OWNER environment variable.",
-    )
-
-    # Repository name argument
-    parser.add_argument(
-        "--repo-name",
-        default=os.getenv("GH_REPO_NAME"),
-        help="The name of the GitHub repository. "
-        "Can be overridden via the GH_REPO_NAME environment variable.",
-    )
-
-    # Trigger comment argument
-    parser.add_argument(
-        "--trigger-comment",
-        default=os.getenv("PAC_TRIGGER_COMMENT"),
-        help="The comment that triggered this command. "
-        "Can be overridden via the PAC_TRIGGER_COMMENT environment variable.",
-    )
-
-    parsed = parser.parse_args()
-    if not parsed.github_token:
-        parser.error(
-            "GitHub API token is required. Use --github-token or GITHUB_TOKEN env variable."
-        )
-    if not parsed.pr_num:
-        parser.error("PR number is required. Use --pr-num or GH_PR_NUM env variable.")
-    if not parsed.pr_sender:
-        parser.error(
-            "PR sender is required. Use --pr-sender or GH_PR_SENDER env variable."
-        )
-    if not parsed.comment_sender:
-        parser.error(
-            "Comment sender is required. Use --comment-sender or GH_COMMENT_SENDER env variable."
-        )
-    if not parsed.repo_owner:
-        parser.error(
-            "Repository owner is required. Use --repo-owner or GH_REPO_OWNER env variable."
-        )
-    if not parsed.repo_name:
-        parser.error(
-            "Repository name is required. Use --repo-name or GH_REPO_NAME env variable."
-        )
-    if not parsed.trigger_comment:
-        parser.error(
-            "Trigger comment is required. Use --trigger-comment or PAC_TRIGGER_COMMENT env variable."
-        )
-    return parsed
-
-
-def main():
-    args = parse_args()
-    # Initialize GitHub API and PR handler
-    api_base = f"https://api.github.com/repos/{args.repo_owner}/{args.repo_name}"
-    headers = {
-        "Authorization": f"Bearer {args.github_token}",
-        "Accept": "application/vnd.github.v3+json",
-    }
-    api = GitHubAPI(api_base, headers)
-    pr_handler = PRHandler(api, args)
-
-    trigger_comment = args.trigger_comment.lstrip("\\n")
-    match = re.match(
-        r"^/(rebase|cherry-pick|merge|assign|unassign|label|unlabel|lgtm|help)(.*)",
-        trigger_comment,
-    )
-    if not match:
-        print(
-            f"⚠️ No valid command found in comment: {trigger_comment}",
-            file=sys.stderr,
-        )
-        sys.exit(1)
-
-    command, values = match.groups()
-    values = values.split()
-
-    if not pr_handler.check_status(args.pr_num, "open"):
-        print(f"⚠️ PR #{args.pr_num} is not open.", file=sys.stderr)
-        sys.exit(1)
-
-    response = None
-    if command in ("assign", "unassign"):
-        response = pr_handler.assign_unassign(command, values)
-    elif command == "label":
-        response = pr_handler.label(values)
-    elif command == "unlabel":
-        response = pr_handler.unlabel(values)
-    elif command == "rebase":
-        response = pr_handler.rebase()
-    elif command == "help":
-        response = pr_handler._post_comment(HELP_TEXT.strip())
-    elif command == "lgtm":
-        pr_handler.lgtm()
-    elif command == "merge":
-        # Pass custom merge method if provided
-        merge_method = (
-            values[0]
-            if values and values[0].lower() in ["merge", "squash", "rebase"]
-            else None
-        )
-        pr_handler.merge_pr(merge_method)
-    elif command == "cherry-pick":
-        pr_handler.cherry_pick(values)
-
-    if response:
-        if not pr_handler.check_response(response):
-            sys.exit(1)
-
-
-if __name__ == "__main__":
-    main()
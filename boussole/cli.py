@@ -0,0 +1,226 @@
+import argparse
+import os
+import sys
+from typing import Callable, Dict, List, Optional
+
+from .boussole import CommandError, PRHandler
+from .client import BoussoleError, GitHubAPI, RequestResponse
+from .messages import render_help
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Manage prow-like commands on a GitHub PullRequest.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,  # Show default values in help
+    )
+    # LGTM threshold argument
+    parser.add_argument(
+        "--lgtm-threshold",
+        default=int(os.getenv("PAC_LGTM_THRESHOLD", "1")),  # Default as string
+        type=int,
+        help="Minimum number of LGTM approvals required to merge a PR. "
+        "Can be overridden via the PAC_LGTM_THRESHOLD environment variable.",
+    )
+    # LGTM permissions argument
+    parser.add_argument(
+        "--lgtm-permissions",
+        default=os.getenv("PAC_LGTM_PERMISSIONS", "admin,write"),
+        help="Comma-separated list of GitHub permissions required to give a valid LGTM. "
+        "Can be overridden via the PAC_LGTM_PERMISSIONS environment variable.",
+    )
+    # LGTM review event argument
+    parser.add_argument(
+        "--lgtm-review-event",
+        default=os.getenv("PAC_LGTM_REVIEW_EVENT", "APPROVE"),
+        help="The type of review event to trigger when an LGTM is given. "
+        "Can be overridden via the PAC_LGTM_REVIEW_EVENT environment variable.",
+    )
+
+    # Merge method argument
+    parser.add_argument(
+        "--merge-method",
+        default=os.getenv("GH_MERGE_METHOD", "rebase"),
+        help="The method to use when merging the pull request. "
+        "Options: 'merge', 'rebase', or 'squash'. "
+        "Can be overridden via the GH_MERGE_METHOD environment variable.",
+    )
+    # Auto merge argument
+    parser.add_argument(
+        "--auto-merge",
+        action="store_true",
+        default=os.getenv("PAC_AUTO_MERGE", "false").lower() == "true",
+        help="Merge the pull request as soon as /lgtm reaches the threshold. "
+        "Can be enabled via the PAC_AUTO_MERGE environment variable.",
+    )
+    # Bot login argument
+    parser.add_argument(
+        "--bot-login",
+        default=os.getenv("PAC_BOT_LOGIN") or None,
+        help="The login the bot comments as, used to skip posting a message "
+        "identical to its latest comment. Looked up from the token when empty, "
+        "required for GitHub App tokens, e.g. 'my-app[bot]'. "
+        "Can be overridden via the PAC_BOT_LOGIN environment variable.",
+    )
+    # GitHub token argument
+    parser.add_argument(
+        "--github-token",
+        default=os.getenv("GITHUB_TOKEN"),
+        help="GitHub API token for authentication. "
+        "Required if the GITHUB_TOKEN environment variable is not set.",
+    )
+    # PR number argument
+    parser.add_argument(
+        "--pr-num",
+        default=os.getenv("GH_PR_NUM"),
+        help="The number of the pull request to operate on. "
+        "Can be overridden via the GH_PR_NUM environment variable.",
+    )
+
+    # PR sender argument
+    parser.add_argument(
+        "--pr-sender",
+        default=os.getenv("GH_PR_SENDER"),
+        help="The GitHub username of the user who opened the pull request. "
+        "Can be overridden via the GH_PR_SENDER environment variable.",
+    )
+
+    # Comment sender argument
+    parser.add_argument(
+        "--comment-sender",
+        default=os.getenv("GH_COMMENT_SENDER"),
+        help="The GitHub username of the user who triggered the command. "
+        "Can be overridden via the GH_COMMENT_SENDER environment variable.",
+    )
+
+    # Repository owner argument
+    parser.add_argument(
+        "--repo-owner",
+        default=os.getenv("GH_REPO_OWNER"),
+        help="The owner (organization or user) of the GitHub repository. "
+        "Can be overridden via the GH_REPO_OWNER environment variable.",
+    )
+
+    # Repository name argument
+    parser.add_argument(
+        "--repo-name",
+        default=os.getenv("GH_REPO_NAME"),
+        help="The name of the GitHub repository. "
+        "Can be overridden via the GH_REPO_NAME environment variable.",
+    )
+
+    # Trigger comment argument
+    parser.add_argument(
+        "--trigger-comment",
+        default=os.getenv("PAC_TRIGGER_COMMENT"),
+        help="The comment that triggered this command. "
+        "Can be overridden via the PAC_TRIGGER_COMMENT environment variable.",
+    )
+
+    parsed = parser.parse_args()
+    if not parsed.github_token:
+        parser.error(
+            "GitHub API token is required. Use --github-token or GITHUB_TOKEN env variable."
+        )
+    if not parsed.pr_num:
+        parser.error("PR number is required. Use --pr-num or GH_PR_NUM env variable.")
+    if not parsed.pr_sender:
+        parser.error(
+            "PR sender is required. Use --pr-sender or GH_PR_SENDER env variable."
+        )
+    if not parsed.comment_sender:
+        parser.error(
+            "Comment sender is required. Use --comment-sender or GH_COMMENT_SENDER env variable."
+        )
+    if not parsed.repo_owner:
+        parser.error(
+            "Repository owner is required. Use --repo-owner or GH_REPO_OWNER env variable."
+        )
+    if not parsed.repo_name:
+        parser.error(
+            "Repository name is required. Use --repo-name or GH_REPO_NAME env variable."
+        )
+    if not parsed.trigger_comment:
+        parser.error(
+            "Trigger comment is required. Use --trigger-comment or PAC_TRIGGER_COMMENT env variable."
+        )
+    return parsed
+
+
+def _merge_command(pr_handler: PRHandler, values: List[str]) -> None:
+    # Pass custom merge method if provided
+    merge_method = (
+        values[0]
+        if values and values[0].lower() in ["merge", "squash", "rebase"]
+        else None
+    )
+    pr_handler.merge_pr(merge_method)
+
+
+def _lgtm_command(pr_handler: PRHandler, _values: List[str]) -> None:
+    pr_handler.lgtm()
+
+
+# Commands dispatched from the trigger comment, the handlers returning a
+# response get it checked by main
+_COMMANDS: Dict[str, Callable[[PRHandler, List[str]], Optional[RequestResponse]]] = {
+    "assign": lambda pr_handler, values: pr_handler.assign_unassign("assign", values),
+    "unassign": lambda pr_handler, values: pr_handler.assign_unassign(
+        "unassign", values
+    ),
+    "label": lambda pr_handler, values: pr_handler.label(values),
+    "unlabel": lambda pr_handler, values: pr_handler.unlabel(values),
+    "rebase": lambda pr_handler, _values: pr_handler.rebase(),
+    "help": lambda pr_handler, _values: pr_handler._post_comment(
+        render_help(threshold=pr_handler.lgtm_threshold)
+    ),
+    "lgtm": _lgtm_command,
+    "merge": _merge_command,
+    "cherry-pick": lambda pr_handler, values: pr_handler.cherry_pick(values),
+}
+
+
+def main():
+    args = parse_args()
+
+    # Parse the command first so nothing is set up for comments to ignore
+    trigger_comment = args.trigger_comment.lstrip("\\n")
+    if not trigger_comment.startswith("/"):
+        # Not addressed to us, this is not a failure
+        print(f"ℹ️ No command found in comment: {trigger_comment}")
+        sys.exit(0)
+    # Only the first line holds the command, the rest is free-form discussion
+    command, *values = trigger_comment.splitlines()[0][1:].split() or [""]
+    if command not in _COMMANDS:
+        print(
+            f"⚠️ No valid command found in comment: {trigger_comment}",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+    # Initialize GitHub API and PR handler
+    api_base = f"https://api.github.com/repos/{args.repo_owner}/{args.repo_name}"
+    headers = {
+        "Authorization": f"Bearer {args.github_token}",
+        "Accept": "application/vnd.github+json",
+        "X-GitHub-Api-Version": "2022-11-28",
+    }
+    with GitHubAPI(api_base, headers) as api:
+        pr_handler = PRHandler(api, args)
+
+        # Errors are reported and turned into the exit status here only
+        try:
+            # /help only posts static text, it does not depend on the PR state
+            if command != "help" and not pr_handler.check_status(args.pr_num, "open"):
+                raise CommandError(f"⚠️ PR #{args.pr_num} is not open.")
+            response = _COMMANDS[command](pr_handler, values)
+        except BoussoleError as e:
+            print(e, file=sys.stderr)
+            sys.exit(1)
+
+    if response:
+        if not pr_handler.check_response(response):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
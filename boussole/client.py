@@ -1,7 +1,39 @@
+import base64
+import email.utils
+import gzip
+import http.client
 import json
+import threading
+import time
+import urllib.parse
 import urllib.request
 from http.client import HTTPResponse
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
+
+# Errors raised when the server dropped an idle keep-alive connection
+_STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    BrokenPipeError,
+    ConnectionResetError,
+)
+
+
+def _retry_after_delay(value: str) -> Optional[float]:
+    """
+    Returns the delay in seconds of a Retry-After header, None if unparsable.
+
+    The header is either a number of seconds or an HTTP-date, proxies in
+    front of the API may send the latter.
+    """
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(date.timestamp() - time.time(), 0.0)
 
 
 class BoussoleError(Exception):
@@ -13,58 +45,236 @@ class BoussoleError(Exception):
 class RequestResponse:
     """
     Wrapper around HTTPResponse to provide consistent interface.
+
+    The body is read as soon as the response is wrapped so the underlying
+    connection can be handed back to the pool, and decompressed when GitHub
+    sent it gzipped.
     """
 
+    # One instance per HTTP call, skip the per-instance __dict__
+    __slots__ = ("response", "_body", "_json_data", "_text")
+
     def __init__(self, response: HTTPResponse):
         self.response = response
+        self._body = response.read()
+        if response.getheader("Content-Encoding") == "gzip":
+            self._body = gzip.decompress(self._body)
         self._json_data = None
+        self._text: Optional[str] = None
 
     @property
     def status_code(self) -> int:
-        return self.response.getcode()
+        return self.response.status
 
     def getcode(self) -> int:
         return self.status_code
 
     def json(self) -> Any:
         if self._json_data is None:
-            self._json_data = json.loads(self.response.read().decode("utf-8"))
+            # Parse the cached text, the body is decoded once for both
+            self._json_data = json.loads(self.text)
         return self._json_data
 
     @property
     def text(self) -> str:
-        return self.response.read().decode("utf-8")
+        if self._text is None:
+            self._text = self._body.decode("utf-8")
+        return self._text
 
     def read(self) -> bytes:
-        return self.response.read()
+        return self._body
+
+    def getheader(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        return self.response.getheader(name, default)
 
 
 class GitHubAPI:
     """
-    Wrapper for GitHub API calls using urllib.request.
+    Wrapper for GitHub API calls using http.client.
+
+    Connections are kept alive and reused across calls, one pool per host.
     """
 
     timeout: int = 10
+    graphql_url: str = "https://api.github.com/graphql"
+    max_redirects: int = 5
+    max_retries: int = 3
+    backoff_factor: float = 0.2
+    retry_statuses: Tuple[int, ...] = (500, 502, 503, 504)
+    # Methods safe to send again when the server answered with a server error
+    idempotent_methods: Tuple[str, ...] = ("GET", "PUT", "DELETE")
+    # Longest wait in seconds accepted for a rate limit to reset before giving up
+    max_rate_limit_wait: float = 60
 
     def __init__(self, base_url: str, headers: Dict[str, str]):
         self.base_url = base_url
-        self.headers = headers
+        # Joined to the relative endpoints, tolerates a trailing slash
+        self._prefix = base_url.rstrip("/") + "/"
+        # GitHub compresses JSON responses several times over when allowed to
+        self.headers = {"Accept-Encoding": "gzip", **headers}
+        self._idle_connections: Dict[str, List[http.client.HTTPSConnection]] = {}
+        self._lock = threading.Lock()
+
+    def _new_connection(self, host: str) -> http.client.HTTPSConnection:
+        proxy = urllib.request.getproxies().get("https")
+        if proxy and not urllib.request.proxy_bypass(host):
+            # Like urllib, a proxy given without a scheme is an HTTP one
+            if "://" not in proxy:
+                proxy = f"http://{proxy}"
+            proxy_url = urllib.parse.urlsplit(proxy)
+            port = proxy_url.port or (443 if proxy_url.scheme == "https" else 80)
+            connection = http.client.HTTPSConnection(
+                proxy_url.hostname, port, timeout=self.timeout
+            )
+            tunnel_headers = {}
+            if proxy_url.username:
+                credentials = (
+                    f"{urllib.parse.unquote(proxy_url.username)}:"
+                    f"{urllib.parse.unquote(proxy_url.password or '')}"
+                )
+                token = base64.b64encode(credentials.encode("utf-8")).decode("ascii")
+                tunnel_headers["Proxy-Authorization"] = f"Basic {token}"
+            connection.set_tunnel(host, headers=tunnel_headers)
+            return connection
+        return http.client.HTTPSConnection(host, timeout=self.timeout)
+
+    def _acquire_connection(
+        self, host: str
+    ) -> Tuple[http.client.HTTPSConnection, bool]:
+        """
+        Returns an idle connection to the host if there is one, a new one otherwise.
+
+        The boolean tells if the connection has been reused.
+        """
+        with self._lock:
+            idle = self._idle_connections.get(host)
+            if idle:
+                return idle.pop(), True
+        return self._new_connection(host), False
+
+    def _release_connection(
+        self, host: str, connection: http.client.HTTPSConnection
+    ) -> None:
+        with self._lock:
+            self._idle_connections.setdefault(host, []).append(connection)
+
+    def _send(
+        self,
+        method: str,
+        url: str,
+        body: Optional[bytes],
+        headers: Dict[str, str],
+    ) -> RequestResponse:
+        parsed = urllib.parse.urlsplit(url)
+        path = f"{parsed.path}?{parsed.query}" if parsed.query else parsed.path
+
+        connection, reused = self._acquire_connection(parsed.netloc)
+        while True:
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = RequestResponse(connection.getresponse())
+                break
+            except (http.client.HTTPException, OSError) as e:
+                connection.close()
+                # An idle connection may have been closed by the server, retry
+                # once on a fresh one. Any other error, a timeout above all,
+                # may come after GitHub processed the request: never resend it
+                if not reused or not isinstance(e, _STALE_CONNECTION_ERRORS):
+                    raise BoussoleError(f"Connection Error: {e}") from e
+                connection, reused = self._new_connection(parsed.netloc), False
+
+        if response.response.will_close:
+            connection.close()
+        else:
+            self._release_connection(parsed.netloc, connection)
+        return response
+
+    def _retry_delay(
+        self, method: str, response: RequestResponse, attempt: int
+    ) -> Optional[float]:
+        """
+        Returns how long to wait before sending the request again, None when it
+        should not be retried.
+
+        Server errors are retried with an exponential backoff. Rate limited
+        requests were not processed by GitHub so they are retried whatever the
+        method, after the delay given by Retry-After or X-RateLimit-Reset.
+        """
+        status = response.status_code
+        backoff = self.backoff_factor * 2**attempt
+        if status in self.retry_statuses:
+            return backoff if method in self.idempotent_methods else None
+
+        retry_after = response.response.getheader("Retry-After")
+        exhausted = response.response.getheader("X-RateLimit-Remaining") == "0"
+        if status != 429 and not (status == 403 and (retry_after or exhausted)):
+            return None
+
+        if retry_after and (after := _retry_after_delay(retry_after)) is not None:
+            delay = after
+        elif reset := response.response.getheader("X-RateLimit-Reset"):
+            delay = max(float(reset) - time.time(), 0.0)
+        else:
+            delay = backoff
+        return delay if delay <= self.max_rate_limit_wait else None
 
     def _make_request(
         self, method: str, endpoint: str, data: Optional[Dict] = None
     ) -> RequestResponse:
-        url = f"{self.base_url}/{endpoint}"
-        request = urllib.request.Request(url, headers=self.headers, method=method)
+        if endpoint.startswith("https://"):
+            url = endpoint
+        else:
+            url = self._prefix + endpoint
 
+        headers = dict(self.headers)
+        body = None
         if data:
-            request.data = json.dumps(data).encode("utf-8")
-            request.add_header("Content-Type", "application/json")
+            # Compact separators, GitHub does not need the pretty-printing spaces
+            body = json.dumps(data, separators=(",", ":")).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+
+        response = self._send(method, url, body, headers)
+        retries = 0
+        while retries < self.max_retries:
+            delay = self._retry_delay(method, response, retries)
+            if delay is None:
+                break
+            time.sleep(delay)
+            response = self._send(method, url, body, headers)
+            retries += 1
+
+        redirects = 0
+        while (
+            method == "GET"
+            and response.status_code in (301, 302, 303, 307, 308)
+            and response.response.getheader("Location")
+            and redirects < self.max_redirects
+        ):
+            url = urllib.parse.urljoin(url, response.response.getheader("Location"))
+            response = self._send(method, url, body, headers)
+            redirects += 1
+
+        if response.status_code >= 300:
+            raise BoussoleError(
+                f"HTTP Error: {response.status_code} - {response.response.reason}"
+            )
+        return response
 
-        try:
-            http_response = urllib.request.urlopen(request, timeout=self.timeout)
-            return RequestResponse(http_response)
-        except urllib.error.HTTPError as e:
-            raise BoussoleError(f"HTTP Error: {e.code} - {e.reason}") from e
+    def close(self) -> None:
+        """
+        Closes every idle connection of the pool.
+        """
+        with self._lock:
+            idle, self._idle_connections = self._idle_connections, {}
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+
+    def __enter__(self) -> "GitHubAPI":
+        return self
+
+    def __exit__(self, *_exc_info) -> None:
+        self.close()
 
     def get(self, endpoint: str) -> RequestResponse:
         return self._make_request("GET", endpoint)
@@ -77,3 +287,6 @@ class GitHubAPI:
 
     def delete(self, endpoint: str, data: Optional[Dict] = None) -> RequestResponse:
         return self._make_request("DELETE", endpoint, data)
+
+    def graphql(self, query: str, variables: Dict) -> RequestResponse:
+        return self.post(self.graphql_url, {"query": query, "variables": variables})
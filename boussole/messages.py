@@ -1,8 +1,10 @@
-import os
+import functools
 
-LGTM_THRESHOLD = int(os.getenv("PAC_LGTM_THRESHOLD", "1"))
 
-HELP_TEXT = f"""
+# Cached already stripped, /help posts it as is
+@functools.lru_cache(maxsize=None)
+def render_help(*, threshold) -> str:
+    return f"""
 ### 🤖 Available Commands
 | Command                     | Description                                                                     |
 | --------------------------- | ------------------------------------------------------------------------------- |
@@ -10,18 +12,19 @@ HELP_TEXT = f"""
 | `/unassign user1 user2`     | Removes assigned users                                                          |
 | `/label bug feature`        | Adds labels to the PR                                                           |
 | `/unlabel bug feature`      | Removes labels from the PR                                                      |
-| `/lgtm`                     | Approves the PR if at least {LGTM_THRESHOLD} org members have commented `/lgtm` |
+| `/lgtm`                     | Approves the PR if at least {threshold} org members have commented `/lgtm` |
 | `/merge [method]`           | Merges the PR if approvals are sufficient. Admin/write users can merge directly with threshold=1 |
 | `/cherry-pick target-branch`| Cherry-picks the PR changes to the target branch                                |
 | `/rebase`                   | Rebases the PR branch on the base branch                                        |
 | `/help`                     | Shows this help message                                                         |
 
 
-*Automated by the [PAC Boussole](https://github.com/openshift-pipelines/pac-boussole) 🧭* 
+*Automated by the [PAC Boussole](https://github.com/openshift-pipelines/pac-boussole) 🧭*
+""".strip()
 
-"""
 
-APPROVED_TEMPLATE = """
+def render_approved(*, pr_sender, threshold, valid_votes, users_table) -> str:
+    return f"""
 Congrats @{pr_sender} your PR Has been approved 🎉
 
 ### ✅ Pull Request Approved
@@ -46,7 +49,9 @@ directly if you have repository permission).
 
 """
 
-LGTM_BREAKDOWN_TEMPLATE = """
+
+def render_lgtm_breakdown(*, valid_votes, threshold, users_table) -> str:
+    return f"""
 ### LGTM Vote Breakdown
 
 * **Current valid votes:** {valid_votes}/{threshold}
@@ -62,7 +67,11 @@ LGTM_BREAKDOWN_TEMPLATE = """
 
 """
 
-SUCCESS_MERGED = """
+
+def render_success_merged(  # pylint: disable=too-many-arguments
+    *, merge_method, comment_sender, valid_votes, lgtm_threshold, users_table, pr_sender
+) -> str:
+    return f"""
 ### ✅ PR Successfully Merged
 
 * Merge method: `{merge_method}`
@@ -81,8 +90,10 @@ Thank you @{pr_sender} for your valuable contribution! 🎉
 
 """
 
+
 # Error and status message templates
-PERMISSION_CHECK_ERROR = """
+def render_permission_check_error(*, user, status_code) -> str:
+    return f"""
 ### ⚠️ Permission Check Failed
 
 Unable to verify permissions for user **@{user}**
@@ -99,7 +110,9 @@ Please check user permissions and try again.
 
 """
 
-PERMISSION_DATA_MISSING = """
+
+def render_permission_data_missing(*, user) -> str:
+    return f"""
 ### ❌ Permission Data Missing
 
 Failed to retrieve permission level for user **@{user}**
@@ -112,7 +125,9 @@ Failed to retrieve permission level for user **@{user}**
 
 """
 
-COMMENTS_FETCH_ERROR = """
+
+def render_comments_fetch_error(*, status_code, response_text, pr_num) -> str:
+    return f"""
 ### 🚫 Failed to Retrieve PR Comments
 
 Unable to process LGTM votes due to API error:
@@ -129,7 +144,9 @@ Unable to process LGTM votes due to API error:
 
 """
 
-SELF_APPROVAL_ERROR = """
+
+def render_self_approval_error(*, user, comment_url) -> str:
+    return f"""
 ### ⚠️ Invalid LGTM Vote
 
 * User **@{user}** attempted to approve their own PR
@@ -143,7 +160,9 @@ Please wait for reviews from other team members.
 
 """
 
-CANNOT_MERGE_OWN_PR = """
+
+def render_cannot_merge_own_pr(*, pr_sender) -> str:
+    return f"""
 ### 🤦‍♂️ You can't assign the PR to @{pr_sender}
 
 The user @{pr_sender} is the author of this Pull Request.
@@ -154,7 +173,9 @@ Nice try though! Authors reviewing their own code is like grading your own exam
 *Automated by the [PAC Boussole](https://github.com/openshift-pipelines/pac-boussole) 🧭* 
 """
 
-INSUFFICIENT_PERMISSIONS = """
+
+def render_insufficient_permissions(*, user, permission, required_permissions) -> str:
+    return f"""
 ### 🔒 Insufficient Permissions
 
 * User **@{user}** does not have permission to merge
@@ -166,10 +187,12 @@ Please request assistance from a repository maintainer.
 *Automated by the [PAC Boussole](https://github.com/openshift-pipelines/pac-boussole) 🧭* 
 """
 
-NOT_ENOUGH_LGTM = """
+
+def render_not_enough_lgtm(*, valid_votes, threshold) -> str:
+    return f"""
 ### ❌ Insufficient Approvals
 
-* Current valid LGTM votes: **{valid_votes}** 
+* Current valid LGTM votes: **{valid_votes}**
 * Required votes: **{threshold}**
 
 Please obtain additional approvals before merging.
@@ -179,7 +202,9 @@ Please obtain additional approvals before merging.
 
 """
 
-MERGE_FAILED = """
+
+def render_merge_failed(*, pr_num, status_code, error_text) -> str:
+    return f"""
 ### ❌ Merge Failed
 
 Unable to merge PR #{pr_num}:
@@ -196,8 +221,12 @@ Please resolve any issues and try again.
 *Automated by the [PAC Boussole](https://github.com/openshift-pipelines/pac-boussole) 🧭* 
 """
 
+
 # Add new error message template for cherry-pick
-CHERRY_PICK_ERROR = """
+def render_cherry_pick_error(
+    *, source_pr, target_branch, status_code, error_text
+) -> str:
+    return f"""
 ### ❌ Cherry Pick Failed
 
 Failed to cherry-pick changes from PR #{source_pr} to branch `{target_branch}`:
@@ -216,7 +245,9 @@ Please resolve any issues and try again.
 
 """
 
-CHERRY_PICK_SUCCESS = """
+
+def render_cherry_pick_success(*, source_pr, target_branch, user, commit_sha) -> str:
+    return f"""
 ### ✅ Cherry Pick Successful
 
 Successfully cherry-picked changes from PR #{source_pr} to branch `{target_branch}`.
@@ -232,8 +263,12 @@ Successfully cherry-picked changes from PR #{source_pr} to branch `{target_branc
 
 """
 
-CHERRY_PICK_CONFLICT = """
-🚨 Merge conflict detected while cherry-picking PR #{self.pr_num} to {target_branch}
+
+def render_cherry_pick_conflict(
+    *, pr_num, target_branch, current_commit, total_commits, commit_sha
+) -> str:
+    return f"""
+🚨 Merge conflict detected while cherry-picking PR #{pr_num} to {target_branch}
 • Progress: {current_commit}/{total_commits} commits
 • Conflicting commit: {commit_sha}
 
@@ -241,7 +276,7 @@ To resolve this conflict:
 1. Create a new branch from {target_branch}
 
 ```shell
-git checkout -b resolve-cherry-pick-{self.pr_num} origin/{target_branch}
+git checkout -b resolve-cherry-pick-{pr_num} origin/{target_branch}
 ```
 
 2. Cherry-pick the commits manually using:
@@ -254,8 +289,8 @@ git cherry-pick {commit_sha}
 4. Create a new PR with your changes
 
 ```shell
-git push YOURFORKREMOTE resolve-cherry-pick-{self.pr_num} --force-with-lease
-gh pr create --base {target_branch} --head YOURFORK:resolve-cherry-pick-{self.pr_num}
+git push YOURFORKREMOTE resolve-cherry-pick-{pr_num} --force-with-lease
+gh pr create --base {target_branch} --head YOURFORK:resolve-cherry-pick-{pr_num}
 
 ```
 
@@ -266,9 +301,11 @@ Need assistance? Please contact the repository maintainers.
 
 """
 
-REVIEW_REQUESTED = """{greeting}
 
-🔍 @{submitter} has kindly requested your review on this PR. 
+def render_review_requested(*, greeting, submitter) -> str:
+    return f"""{greeting}
+
+🔍 @{submitter} has kindly requested your review on this PR.
 
 • Please review the changes and provide your feedback
 • Look for code quality, potential bugs, and overall design
@@ -286,7 +323,8 @@ Thank you for your help! 🙌
 """
 
 
-CHECKS_NOT_PASSED = """⚠️ Cannot merge PR: Some required checks haven't completed successfully.
+def render_checks_not_passed(*, status_table) -> str:
+    return f"""⚠️ Cannot merge PR: Some required checks haven't completed successfully.
 
 {status_table}
 
@@ -0,0 +1,172 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .client import RequestResponse
+
+# Fetches everything the merge path needs in a single GraphQL request
+PREFETCH_QUERY = """
+query($owner: String!, $name: String!, $number: Int!) {
+  repository(owner: $owner, name: $name) {
+    pullRequest(number: $number) {
+      reviews(first: 100, states: APPROVED) {
+        pageInfo { hasNextPage }
+        nodes { state author { __typename login } }
+      }
+      comments(first: 100) {
+        pageInfo { hasNextPage }
+        nodes { body url author { __typename login } }
+      }
+      commits(last: 1) {
+        nodes {
+          commit {
+            statusCheckRollup {
+              contexts(first: 100) {
+                pageInfo { hasNextPage }
+                nodes { ... on CheckRun { name status conclusion url } }
+              }
+            }
+          }
+        }
+      }
+    }
+    collaborators(first: 100) {
+      edges { permission node { login } }
+    }
+  }
+}
+"""
+
+# Fetches only the votes for /lgtm, the fields the vote check reads and nothing
+# else, parsed by the same code as PREFETCH_QUERY
+VOTES_QUERY = """
+query($owner: String!, $name: String!, $number: Int!) {
+  repository(owner: $owner, name: $name) {
+    pullRequest(number: $number) {
+      reviews(first: 100, states: APPROVED) {
+        pageInfo { hasNextPage }
+        nodes { state author { __typename login } }
+      }
+      comments(first: 100) {
+        pageInfo { hasNextPage }
+        nodes { body url author { __typename login } }
+      }
+    }
+  }
+}
+"""
+
+
+def permissions_query(count: int) -> str:
+    """
+    Builds a query looking up the permission of count users at once.
+
+    Each user is passed as the $u<index> variable and answered under the
+    u<index> alias.
+    """
+    variables = "".join(f", $u{i}: String!" for i in range(count))
+    fields = "".join(
+        f"    u{i}: collaborators(query: $u{i}, first: 10) {{\n"
+        "      edges { permission node { login } }\n"
+        "    }\n"
+        for i in range(count)
+    )
+    return (
+        f"query($owner: String!, $name: String!{variables}) {{\n"
+        "  repository(owner: $owner, name: $name) {\n"
+        f"{fields}"
+        "  }\n"
+        "}\n"
+    )
+
+
+# GraphQL repository permissions mapped to their REST counterparts
+GRAPHQL_PERMISSIONS = {
+    "ADMIN": "admin",
+    "MAINTAIN": "write",
+    "WRITE": "write",
+    "TRIAGE": "read",
+    "READ": "read",
+}
+
+
+def graphql_repository(response: RequestResponse) -> Optional[Dict]:
+    """
+    Returns the repository of a GraphQL answer, None when the request failed.
+    """
+    if response.status_code != 200:
+        return None
+    payload = response.json()
+    if not isinstance(payload, dict) or payload.get("errors"):
+        return None
+    return (payload.get("data") or {}).get("repository")
+
+
+def graphql_login(author: Optional[Dict]) -> str:
+    """
+    Returns the login of a GraphQL author the way the REST API reports it.
+    """
+    if not author:
+        return "ghost"
+    if author.get("__typename") == "Bot":
+        return f"{author['login']}[bot]"
+    return author["login"]
+
+
+def parse_reviews(reviews: Dict) -> Optional[List[Dict]]:
+    """
+    Returns the reviews in the REST format, None when truncated by pagination.
+    """
+    if reviews["pageInfo"]["hasNextPage"]:
+        return None
+    return [
+        {"state": review["state"], "user": {"login": graphql_login(review["author"])}}
+        for review in reviews["nodes"]
+    ]
+
+
+def parse_comments(comments: Dict) -> Optional[List[Dict]]:
+    """
+    Returns the comments in the REST format, None when truncated by pagination.
+    """
+    if comments["pageInfo"]["hasNextPage"]:
+        return None
+    return [
+        {
+            "body": comment["body"],
+            "html_url": comment["url"],
+            "user": {"login": graphql_login(comment["author"])},
+        }
+        for comment in comments["nodes"]
+    ]
+
+
+def parse_check_runs(commits: List[Dict]) -> Optional[List[Dict]]:
+    """
+    Returns the check runs of the head commit in the REST format, None when
+    truncated by pagination.
+    """
+    rollup = commits[0]["commit"]["statusCheckRollup"] if commits else None
+    if rollup is None:
+        return []
+    if rollup["contexts"]["pageInfo"]["hasNextPage"]:
+        return None
+    return [
+        {
+            "name": check["name"],
+            "status": check["status"].lower(),
+            "conclusion": (check["conclusion"] or "").lower() or None,
+            "html_url": check["url"],
+        }
+        # Commit statuses come back as empty nodes, only keep check runs
+        for check in rollup["contexts"]["nodes"]
+        if check
+    ]
+
+
+def parse_permissions(collaborators: Optional[Dict]) -> Iterator[Tuple[str, str]]:
+    """
+    Yields the login and REST permission of each collaborator edge.
+    """
+    for edge in (collaborators or {}).get("edges") or []:
+        permission = GRAPHQL_PERMISSIONS.get(edge["permission"])
+        if permission:
+            yield edge["node"]["login"], permission
@@ -6,13 +6,21 @@ from unittest.mock import MagicMock
 import pytest
 
 sys.path.append("../boussole")  # TODO: Find a better way to import the module
-from boussole.boussole import GitHubAPI, PRHandler  # Import main and PRHandler
+from boussole.boussole import (  # Import main and PRHandler
+    BoussoleError,
+    CommandError,
+    GitHubAPI,
+    LGTMError,
+    MergeError,
+    PRHandler,
+)
 
 
 class MyFakeResponse:
-    def __init__(self, status_code, body):
+    def __init__(self, status_code, body, headers=None):
         self.body = body
         self.status_code = status_code
+        self.headers = headers or {}
 
     def get(self, _key, default=None):
         return self.body if isinstance(self.body, dict) else default
@@ -20,18 +28,36 @@ class MyFakeResponse:
     def json(self):
         return self.body
 
+    def getheader(self, name, default=None):
+        return self.headers.get(name, default)
 
-@pytest.fixture
+
+HTTP_METHODS = ("get", "post", "put", "delete")
+
+
+def routed(responses):
+    # Answers each endpoint from the mapping whatever the order of the calls
+    return lambda endpoint, *_: responses[endpoint]
+
+
+@pytest.fixture(scope="module")
 def mock_api():
     api = GitHubAPI(
         "https://api.github.com/repos/test/repo", {"Authorization": "Bearer test_token"}
     )
-    for method in ("get", "post", "put", "delete"):
+    for method in HTTP_METHODS:
         setattr(api, method, MagicMock())
     return api
 
 
-@pytest.fixture
+@pytest.fixture(autouse=True)
+def reset_mock_api(mock_api):
+    # The API is shared by the module, give every test pristine mocks
+    for method in HTTP_METHODS:
+        getattr(mock_api, method).reset_mock(return_value=True, side_effect=True)
+
+
+@pytest.fixture(scope="module")
 def mock_args():
     return argparse.Namespace(
         pr_num="123",
@@ -41,6 +67,8 @@ def mock_args():
         lgtm_permissions="admin,write",
         lgtm_review_event="APPROVE",
         merge_method="squash",
+        auto_merge=False,
+        bot_login="",
         repo_owner="test",
         repo_name="repo",
         github_token="test_token",
@@ -60,6 +88,47 @@ def test_post_comment(pr_handler, mock_api):
     )
 
 
+def test_post_comment_skips_duplicate_of_latest_bot_comment(pr_handler, mock_api):
+    pr_handler.bot_login = "boussole[bot]"
+    pr_handler._comments_cache = [
+        {"body": "Already said", "user": {"login": "boussole[bot]"}},
+        {"body": "Thanks!", "user": {"login": "reviewer1"}},
+    ]
+
+    # A human commented after the bot, its latest message is still matched
+    assert pr_handler._post_comment("Already said") is None
+    mock_api.post.assert_not_called()
+
+    pr_handler._post_comment("Thanks!")
+    mock_api.post.assert_called_once_with("issues/123/comments", {"body": "Thanks!"})
+
+
+def test_post_comment_fetches_comments_and_bot_login(mock_api, mock_args):
+    args = argparse.Namespace(**{**vars(mock_args), "bot_login": None})
+    pr_handler = PRHandler(api=mock_api, args=args)
+    mock_api.get.side_effect = routed(
+        {
+            "https://api.github.com/user": MyFakeResponse(
+                200, {"login": "boussole-bot"}
+            ),
+            "issues/123/comments?per_page=100&page=1": MyFakeResponse(
+                200,
+                [
+                    {
+                        "body": "✅ Added labels: <b>bug</b>.",
+                        "user": {"login": "boussole-bot"},
+                    }
+                ],
+            ),
+        }
+    )
+
+    # A retried /label run does not confirm twice
+    assert pr_handler._post_comment("✅ Added labels: <b>bug</b>.") is None
+    mock_api.post.assert_not_called()
+    assert pr_handler.bot_login == "boussole-bot"
+
+
 def test_assign_unassign(pr_handler, mock_api):
     pr_handler.assign_unassign("assign", ["user1", "user2"])
     mock_api.post.assert_called_once_with(
@@ -68,16 +137,21 @@ def test_assign_unassign(pr_handler, mock_api):
 
 
 def test_label(pr_handler, mock_api):
+    mock_api.post.return_value.status_code = 200
     pr_handler.label(["bug", "enhancement"])
 
-    # Ensure both calls happened
-    assert mock_api.post.call_count == 2
-    mock_api.post.assert_any_call(
-        "issues/123/labels", {"labels": ["bug", "enhancement"]}
-    )
-    mock_api.post.assert_any_call(
-        "issues/123/comments", {"body": "✅ Added labels: <b>bug, enhancement</b>."}
-    )
+    # The labels are added before the confirmation is posted
+    assert [c.args for c in mock_api.post.call_args_list] == [
+        ("issues/123/labels", {"labels": ["bug", "enhancement"]}),
+        ("issues/123/comments", {"body": "✅ Added labels: <b>bug, enhancement</b>."}),
+    ]
+
+
+def test_label_failure_skips_confirmation(pr_handler, mock_api):
+    mock_api.post.return_value.status_code = 422
+    pr_handler.label(["bug"])
+
+    mock_api.post.assert_called_once_with("issues/123/labels", {"labels": ["bug"]})
 
 
 def test_unlabel(pr_handler, mock_api):
@@ -85,6 +159,48 @@ def test_unlabel(pr_handler, mock_api):
     mock_api.delete.assert_called_once_with("issues/123/labels/bug")
 
 
+def test_unlabel_multiple(pr_handler, mock_api):
+    pr_handler.unlabel(["bug", "good first issue"])
+    assert mock_api.delete.call_count == 2
+    mock_api.delete.assert_any_call("issues/123/labels/bug")
+    mock_api.delete.assert_any_call("issues/123/labels/good%20first%20issue")
+    mock_api.post.assert_called_once_with(
+        "issues/123/comments",
+        {"body": "✅ Removed labels: <b>bug, good first issue</b>."},
+    )
+
+
+def test_rebase(pr_handler, mock_api):
+    mock_api.put.return_value = MyFakeResponse(202, {})
+    pr_handler.rebase()
+    mock_api.put.assert_called_once_with("pulls/123/update-branch", {})
+    mock_api.post.assert_called_once_with(
+        "issues/123/comments",
+        {"body": "✅ Rebased the PR branch on the base branch."},
+    )
+
+
+def test_rebase_failure_skips_confirmation(pr_handler, mock_api):
+    mock_api.put.return_value = MyFakeResponse(422, {"message": "merge conflict"})
+    assert pr_handler.rebase().status_code == 422
+    mock_api.post.assert_not_called()
+
+
+def test_unlabel_reports_failed_deletes(pr_handler, mock_api):
+    def delete(endpoint):
+        if endpoint.endswith("/missing"):
+            raise BoussoleError("HTTP Error: 404 - Not Found")
+        return MyFakeResponse(200, [])
+
+    mock_api.delete.side_effect = delete
+
+    with pytest.raises(CommandError, match=r"missing \(HTTP Error: 404"):
+        pr_handler.unlabel(["bug", "missing"])
+    mock_api.post.assert_called_once_with(
+        "issues/123/comments", {"body": "✅ Removed labels: <b>bug</b>."}
+    )
+
+
 def test_check_membership(pr_handler, mock_api):
     mock_api.get.return_value.status_code = 200
     mock_api.get.return_value.json.return_value = {"permission": "write"}
@@ -93,6 +209,31 @@ def test_check_membership(pr_handler, mock_api):
     assert is_valid is True
 
 
+def test_lgtm_permissions_are_stripped(mock_api, mock_args):
+    args = argparse.Namespace(
+        **{**vars(mock_args), "lgtm_permissions": "admin, write,"}
+    )
+    pr_handler = PRHandler(api=mock_api, args=args)
+    assert pr_handler.lgtm_permissions == frozenset({"admin", "write"})
+
+
+def test_check_membership_is_cached(pr_handler, mock_api):
+    mock_api.get.return_value.status_code = 200
+    mock_api.get.return_value.json.return_value = {"permission": "write"}
+    assert pr_handler._check_membership("reviewer") == ("write", True)
+    assert pr_handler._check_membership("reviewer") == ("write", True)
+    mock_api.get.assert_called_once_with("collaborators/reviewer/permission")
+
+
+def test_check_response(pr_handler, capsys):
+    assert pr_handler.check_response(MyFakeResponse(200, {})) is True
+    assert pr_handler.check_response(MyFakeResponse(204, None)) is True
+
+    failed = MagicMock(status_code=404, text="Not Found")
+    assert pr_handler.check_response(failed) is False
+    assert "status: 404 Not Found" in capsys.readouterr().err
+
+
 def test_lgtm(pr_handler, mock_api):
     mock_api.get.return_value.status_code = 200
 
@@ -136,6 +277,79 @@ def test_lgtm_by_review_request(pr_handler, mock_api, capsys):
     assert "PR approved with LGTM votes" in capsys.readouterr().out
 
 
+def test_lgtm_below_threshold_reports_valid_votes(pr_handler, mock_api):
+    mock_api.get.side_effect = routed(
+        {
+            "pulls/123/reviews?per_page=100&page=1": MyFakeResponse(200, []),
+            "issues/123/comments?per_page=100&page=1": MyFakeResponse(
+                200, [{"body": "/lgtm", "user": {"login": "reviewer1"}}]
+            ),
+            "collaborators/reviewer1/permission": MyFakeResponse(
+                200, {"permission": "admin"}
+            ),
+        }
+    )
+
+    assert pr_handler.lgtm() == 1
+    body = mock_api.post.call_args[0][1]["body"]
+    assert "| @reviewer1 | `admin` | ✅ |" in body
+    assert "**Current valid votes:** 1/2" in body
+
+
+def test_fetch_lgtm_votes_ignores_non_command_comments(pr_handler, mock_api):
+    mock_api.get.return_value.status_code = 200
+    mock_api.get.return_value.json.side_effect = [
+        [],
+        [
+            {"body": "Looks good, will /lgtm later", "user": {"login": "chatty"}},
+            {"body": "/lgtmfoo", "user": {"login": "typo"}},
+            {"body": "/LGTM", "user": {"login": "reviewer1"}},
+        ],
+        {"permission": "write"},
+    ]
+
+    valid_votes, lgtm_users = pr_handler._fetch_and_validate_lgtm_votes()
+    assert valid_votes == 1
+    assert lgtm_users == {"reviewer1": "write"}
+
+
+def test_get_comments_paginates(pr_handler, mock_api):
+    first_page = [{"body": "hello", "user": {"login": "chatty"}}] * 100
+    mock_api.get.side_effect = [
+        MyFakeResponse(200, first_page),
+        MyFakeResponse(200, [{"body": "/lgtm", "user": {"login": "reviewer1"}}]),
+    ]
+
+    comments = pr_handler._get_comments()
+    assert len(comments) == 101
+    assert pr_handler._get_comments() is comments
+    assert [call.args[0] for call in mock_api.get.call_args_list] == [
+        "issues/123/comments?per_page=100&page=1",
+        "issues/123/comments?per_page=100&page=2",
+    ]
+
+
+def test_get_all_pages_fetches_remaining_pages_concurrently(pr_handler, mock_api):
+    link = (
+        '<https://api.github.com/repositories/1/issues/123/comments?per_page=100&page=2>; rel="next", '
+        '<https://api.github.com/repositories/1/issues/123/comments?per_page=100&page=3>; rel="last"'
+    )
+    page = [{"body": "hello", "user": {"login": "chatty"}}]
+    mock_api.get.side_effect = routed(
+        {
+            "issues/123/comments?per_page=100&page=1": MyFakeResponse(
+                200, page * 100, headers={"Link": link}
+            ),
+            "issues/123/comments?per_page=100&page=2": MyFakeResponse(200, page * 100),
+            "issues/123/comments?per_page=100&page=3": MyFakeResponse(200, page),
+        }
+    )
+
+    _, comments = pr_handler._get_all_pages("issues/123/comments")
+    assert len(comments) == 201
+    assert mock_api.get.call_count == 3
+
+
 def test_lgtm_self_approval(pr_handler, mock_api):
     mock_api.get.return_value.status_code = 200
 
@@ -151,18 +365,16 @@ def test_lgtm_self_approval(pr_handler, mock_api):
         ],
     ]
 
-    with pytest.raises(SystemExit) as exc_info:
+    with pytest.raises(LGTMError):
         pr_handler.lgtm()
-    assert exc_info.value.code == 1
 
 
 def test_lgtm_comments_fetch_error(pr_handler, mock_api):
     mock_api.get.return_value.status_code = 500
     mock_api.get.return_value.text = "API Error"
 
-    with pytest.raises(SystemExit) as exc_info:
+    with pytest.raises(LGTMError):
         pr_handler.lgtm()
-    assert exc_info.value.code == 1
 
 
 def test_check_membership_invalid_response(pr_handler, mock_api):
@@ -172,10 +384,11 @@ def test_check_membership_invalid_response(pr_handler, mock_api):
     assert is_valid is False
 
 
-def test_merge_pr_no_all_checks_succeed(capsys, pr_handler, mock_api):
+def test_merge_pr_no_all_checks_succeed(pr_handler, mock_api):
     all_checks = MyFakeResponse(
         200,
         {
+            "total_count": 2,
             "check_runs": [
                 {
                     "name": "check-1",
@@ -195,16 +408,111 @@ def test_merge_pr_no_all_checks_succeed(capsys, pr_handler, mock_api):
 
     mock_responses = [
         MyFakeResponse(200, {"permission": "admin"}),
+        MyFakeResponse(200, {}),
+        MyFakeResponse(200, [{"body": "/lgtm", "user": {"login": "reviewer1"}}]),
+        MyFakeResponse(200, {"permission": "write"}),  # reviewer1
         MyFakeResponse(200, {"head": {"sha": "abc123"}}),
         all_checks,
     ]
 
     mock_api.get.side_effect = mock_responses
 
-    with pytest.raises(SystemExit) as exc_info:
+    with pytest.raises(MergeError, match="Cannot merge PR"):
         pr_handler.merge_pr()
-        assert "Cannot merge PR" in capsys.err
-    assert exc_info.value.code == 1
+
+
+def test_check_runs_status(pr_handler, mock_api):
+    mock_api.get.side_effect = [
+        MyFakeResponse(200, {"head": {"sha": "abc123"}}),
+        MyFakeResponse(
+            200,
+            {
+                "total_count": 4,
+                "check_runs": [
+                    {
+                        "name": "lint",
+                        "status": "completed",
+                        "conclusion": "skipped",
+                        "html_url": "http://test.url/1",
+                    },
+                    {
+                        "name": "unit",
+                        "status": "completed",
+                        "conclusion": "failure",
+                        "html_url": "http://test.url/2",
+                    },
+                    {
+                        "name": "e2e",
+                        "status": "in_progress",
+                        "conclusion": None,
+                        "html_url": "http://test.url/3",
+                    },
+                    {
+                        "name": "pac / boussole",
+                        "status": "in_progress",
+                        "conclusion": None,
+                        "html_url": "http://test.url/4",
+                    },
+                ],
+            },
+        ),
+    ]
+
+    all_success, problems = pr_handler._check_runs_status()
+    assert all_success is False
+    assert [check["name"] for check in problems] == ["unit", "e2e"]
+    mock_api.get.assert_called_with("commits/abc123/check-runs?per_page=100")
+
+
+def test_check_runs_status_pages_through_all_runs(pr_handler, mock_api):
+    passed = {
+        "name": "lint",
+        "status": "completed",
+        "conclusion": "success",
+        "html_url": "http://test.url/1",
+    }
+    failed = {**passed, "name": "e2e", "conclusion": "failure"}
+    mock_api.get.side_effect = routed(
+        {
+            "pulls/123": MyFakeResponse(200, {"head": {"sha": "abc123"}}),
+            "commits/abc123/check-runs?per_page=100": MyFakeResponse(
+                200, {"total_count": 101, "check_runs": [passed] * 100}
+            ),
+            "commits/abc123/check-runs?per_page=100&page=2": MyFakeResponse(
+                200, {"total_count": 101, "check_runs": [failed]}
+            ),
+        }
+    )
+
+    all_success, problems = pr_handler._check_runs_status()
+    assert all_success is False
+    assert [check["name"] for check in problems] == ["e2e"]
+
+
+def test_check_runs_status_fails_closed_on_missing_runs(pr_handler, mock_api):
+    mock_api.get.side_effect = routed(
+        {
+            "pulls/123": MyFakeResponse(200, {"head": {"sha": "abc123"}}),
+            "commits/abc123/check-runs?per_page=100": MyFakeResponse(
+                200, {"total_count": 2, "check_runs": []}
+            ),
+        }
+    )
+
+    assert pr_handler._check_runs_status() == (False, [])
+
+
+def test_merge_pr_not_enough_votes_skips_checks(pr_handler, mock_api):
+    mock_api.get.side_effect = [
+        MyFakeResponse(200, {"permission": "admin"}),
+        MyFakeResponse(200, {}),
+        MyFakeResponse(200, []),
+    ]
+
+    assert pr_handler.merge_pr() is False
+    assert "Insufficient Approvals" in mock_api.post.call_args[0][1]["body"]
+    assert mock_api.get.call_count == 3
+    mock_api.put.assert_not_called()
 
 
 def test_merge_pr_success(pr_handler, mock_api):
@@ -219,6 +527,7 @@ def test_merge_pr_success(pr_handler, mock_api):
     all_checks = MyFakeResponse(
         200,
         {
+            "total_count": 1,
             "check_runs": [
                 {
                     "name": "check-1",
@@ -230,26 +539,31 @@ def test_merge_pr_success(pr_handler, mock_api):
         },
     )
 
-    mock_responses = [
-        MyFakeResponse(200, {"permission": "admin"}),
-        MyFakeResponse(200, {"head": {"sha": "abc123"}}),
-        all_checks,
-        MyFakeResponse(200, {}),
-        all_comments,
-        MyFakeResponse(200, {"permission": "write"}),  # reviewer1
-        MyFakeResponse(200, {"permission": "write"}),  # reviewer2
-        all_comments,
-        MyFakeResponse(200, {"permission": "write"}),  # reviewer1
-        MyFakeResponse(200, {"permission": "write"}),  # reviewer2
-    ]
-
-    mock_api.get.side_effect = mock_responses
+    mock_responses = {
+        "collaborators/reviewer/permission": MyFakeResponse(
+            200, {"permission": "admin"}
+        ),
+        "pulls/123/reviews?per_page=100&page=1": MyFakeResponse(200, []),
+        "issues/123/comments?per_page=100&page=1": all_comments,
+        "collaborators/reviewer1/permission": MyFakeResponse(
+            200, {"permission": "write"}
+        ),
+        "collaborators/reviewer2/permission": MyFakeResponse(
+            200, {"permission": "write"}
+        ),
+        "pulls/123": MyFakeResponse(200, {"head": {"sha": "abc123"}}),
+        "commits/abc123/check-runs?per_page=100": all_checks,
+    }
+
+    mock_api.get.side_effect = routed(mock_responses)
 
     # Mock successful merge
     mock_api.put.return_value.status_code = 200
     mock_api.post.return_value.status_code = 200
 
     assert pr_handler.merge_pr() is True
+    # Comments are fetched once and reused for the cherry-pick scan
+    assert mock_api.get.call_count == len(mock_responses)
 
     # Verify merge call
     mock_api.put.assert_called_with(
@@ -260,14 +574,258 @@ def test_merge_pr_success(pr_handler, mock_api):
     )
 
 
+def test_merge_pr_counts_merger_vote_with_similar_login(mock_api, mock_args):
+    # The PR author login is a prefix of the merger one, they are still distinct
+    args = argparse.Namespace(**{**vars(mock_args), "comment_sender": "test_user2"})
+    pr_handler = PRHandler(api=mock_api, args=args)
+    mock_api.get.side_effect = [
+        MyFakeResponse(200, {"permission": "admin"}),
+        MyFakeResponse(200, {}),
+        MyFakeResponse(200, [{"body": "/lgtm", "user": {"login": "reviewer1"}}]),
+        MyFakeResponse(200, {"permission": "write"}),
+        MyFakeResponse(200, {"head": {"sha": "abc123"}}),
+        MyFakeResponse(200, {"total_count": 0, "check_runs": []}),
+    ]
+    mock_api.put.return_value.status_code = 200
+    mock_api.post.return_value.status_code = 200
+
+    assert pr_handler.merge_pr() is True
+    mock_api.put.assert_called_with("pulls/123/merge", {"merge_method": "squash"})
+
+
+def test_graphql_prefetch(pr_handler, mock_api):
+    mock_api.post.return_value = MyFakeResponse(
+        200,
+        {
+            "data": {
+                "repository": {
+                    "pullRequest": {
+                        "reviews": {
+                            "pageInfo": {"hasNextPage": False},
+                            "nodes": [
+                                {
+                                    "state": "APPROVED",
+                                    "author": {"__typename": "User", "login": "r1"},
+                                }
+                            ],
+                        },
+                        "comments": {
+                            "pageInfo": {"hasNextPage": False},
+                            "nodes": [
+                                {
+                                    "body": "/lgtm",
+                                    "url": "http://test.url",
+                                    "author": {"__typename": "User", "login": "r2"},
+                                },
+                                {
+                                    "body": "hello",
+                                    "url": "http://test.url",
+                                    "author": {"__typename": "Bot", "login": "ci"},
+                                },
+                            ],
+                        },
+                        "commits": {
+                            "nodes": [
+                                {
+                                    "commit": {
+                                        "statusCheckRollup": {
+                                            "contexts": {
+                                                "pageInfo": {"hasNextPage": False},
+                                                "nodes": [
+                                                    {
+                                                        "name": "check-1",
+                                                        "status": "COMPLETED",
+                                                        "conclusion": "SUCCESS",
+                                                        "url": "http://test.url",
+                                                    },
+                                                    {},
+                                                ],
+                                            }
+                                        }
+                                    }
+                                }
+                            ]
+                        },
+                    },
+                    "collaborators": {
+                        "edges": [
+                            {"permission": "ADMIN", "node": {"login": "r1"}},
+                            {"permission": "MAINTAIN", "node": {"login": "r2"}},
+                        ]
+                    },
+                }
+            }
+        },
+    )
+
+    assert pr_handler._graphql_prefetch() is True
+    assert pr_handler._get_comments()[1]["user"]["login"] == "ci[bot]"
+    assert pr_handler._check_runs_status() == (True, [])
+    assert pr_handler._fetch_and_validate_lgtm_votes() == (
+        2,
+        {"r1": "admin", "r2": "write"},
+    )
+    mock_api.get.assert_not_called()
+
+
+def test_lgtm_uses_graphql_votes(pr_handler, mock_api):
+    votes = {
+        "data": {
+            "repository": {
+                "pullRequest": {
+                    "reviews": {
+                        "pageInfo": {"hasNextPage": False},
+                        "nodes": [
+                            {
+                                "state": "APPROVED",
+                                "author": {"__typename": "User", "login": "reviewer1"},
+                            }
+                        ],
+                    },
+                    "comments": {
+                        "pageInfo": {"hasNextPage": False},
+                        "nodes": [
+                            {
+                                "body": "/lgtm",
+                                "url": "http://test.url",
+                                "author": {"__typename": "User", "login": "reviewer2"},
+                            }
+                        ],
+                    },
+                }
+            }
+        }
+    }
+    permissions = {
+        "data": {
+            "repository": {
+                f"u{i}": {"edges": [{"permission": "WRITE", "node": {"login": login}}]}
+                for i, login in enumerate(["reviewer1", "reviewer2"])
+            }
+        }
+    }
+    mock_api.post.side_effect = [
+        MyFakeResponse(200, votes),
+        MyFakeResponse(200, permissions),
+        MyFakeResponse(200, {}),
+    ]
+
+    assert pr_handler.lgtm() == 2
+    mock_api.get.assert_not_called()
+    assert "commits" not in mock_api.post.call_args_list[0].args[1]["query"]
+    assert pr_handler._check_runs_cache is None
+    assert mock_api.post.call_args.args[0] == "pulls/123/reviews"
+
+
+@pytest.mark.parametrize("trigger_permission, valid_votes", [("WRITE", 3), ("READ", 2)])
+def test_lgtm_auto_merge_reuses_votes(
+    mock_api, mock_args, trigger_permission, valid_votes
+):
+    # The /lgtm of the commenter reaches the threshold, read-only or not
+    args = argparse.Namespace(**{**vars(mock_args), "auto_merge": True})
+    pr_handler = PRHandler(api=mock_api, args=args)
+    prefetch = {
+        "data": {
+            "repository": {
+                "pullRequest": {
+                    "reviews": {"pageInfo": {"hasNextPage": False}, "nodes": []},
+                    "comments": {
+                        "pageInfo": {"hasNextPage": False},
+                        "nodes": [
+                            {
+                                "body": "/lgtm",
+                                "url": "http://test.url",
+                                "author": {"__typename": "User", "login": login},
+                            }
+                            for login in ["reviewer1", "reviewer2", "reviewer"]
+                        ],
+                    },
+                },
+                "collaborators": {
+                    "edges": [
+                        {"permission": "WRITE", "node": {"login": "reviewer1"}},
+                        {"permission": "WRITE", "node": {"login": "reviewer2"}},
+                        {
+                            "permission": trigger_permission,
+                            "node": {"login": "reviewer"},
+                        },
+                    ]
+                },
+            }
+        }
+    }
+    mock_api.post.side_effect = routed(
+        {
+            GitHubAPI.graphql_url: MyFakeResponse(200, prefetch),
+            "pulls/123/reviews": MyFakeResponse(200, {}),
+            "issues/123/comments": MyFakeResponse(201, {}),
+        }
+    )
+    mock_api.get.side_effect = routed(
+        {
+            "pulls/123": MyFakeResponse(200, {"head": {"sha": "abc123"}}),
+            "commits/abc123/check-runs?per_page=100": MyFakeResponse(
+                200, {"total_count": 0, "check_runs": []}
+            ),
+        }
+    )
+    mock_api.put.return_value.status_code = 200
+
+    assert pr_handler.lgtm() == valid_votes
+    # The merge leg reads the votes and permissions from the caches
+    assert [call.args[0] for call in mock_api.post.call_args_list] == [
+        GitHubAPI.graphql_url,
+        "pulls/123/reviews",
+        "issues/123/comments",
+    ]
+    mock_api.put.assert_called_once_with("pulls/123/merge", {"merge_method": "squash"})
+    assert "Merged" in mock_api.post.call_args.args[1]["body"]
+
+
+def test_graphql_prefetch_errors(pr_handler, mock_api):
+    mock_api.post.return_value = MyFakeResponse(200, {"errors": [{"message": "no"}]})
+    assert pr_handler._graphql_prefetch() is False
+    assert pr_handler._comments_cache is None
+
+
+def test_graphql_permissions(pr_handler, mock_api):
+    mock_api.post.return_value = MyFakeResponse(
+        200,
+        {
+            "data": {
+                "repository": {
+                    "u0": {
+                        "edges": [
+                            {"permission": "READ", "node": {"login": "reviewer10"}},
+                            {"permission": "MAINTAIN", "node": {"login": "Reviewer1"}},
+                        ]
+                    },
+                    "u1": {"edges": []},
+                }
+            }
+        },
+    )
+
+    pr_handler._graphql_permissions(["reviewer1", "outsider"])
+
+    query, variables = mock_api.post.call_args[0][1].values()
+    assert "u1: collaborators(query: $u1" in query
+    assert variables == {
+        "owner": "test",
+        "name": "repo",
+        "u0": "reviewer1",
+        "u1": "outsider",
+    }
+    assert pr_handler._perm_cache == {"reviewer1": ("write", True)}
+
+
 def test_merge_pr_insufficient_permissions(pr_handler, mock_api):
     # Mock permission check failure
     mock_api.get.return_value.status_code = 200
     mock_api.get.return_value.json.return_value = {"permission": "read"}
 
-    with pytest.raises(SystemExit) as exc_info:
+    with pytest.raises(MergeError):
         pr_handler.merge_pr()
-    assert exc_info.value.code == 1
 
 
 def test_merge_pr_failure(pr_handler, mock_api):
@@ -279,9 +837,8 @@ def test_merge_pr_failure(pr_handler, mock_api):
     # Mock failed merge
     mock_api.put.return_value.status_code = 405
     mock_api.put.return_value.text = "Merge conflict"
-    with pytest.raises(SystemExit) as mock_exit:
-        assert pr_handler.merge_pr() is False
-        assert mock_exit.value.code == 1
+    with pytest.raises(MergeError):
+        pr_handler.merge_pr()
 
 
 def test_post_lgtm_breakdown(pr_handler, mock_api):
@@ -312,9 +869,8 @@ def test_check_status(pr_handler, mock_api):
     # Mock unsuccessful response
     mock_api.get.return_value.status_code = 404
     mock_api.get.return_value.text = "Not Found"
-    with pytest.raises(SystemExit) as exc_info:
+    with pytest.raises(CommandError):
         pr_handler.check_status("123", "open")
-    assert exc_info.value.code == 1
 
 
 def test_merge_pr_with_custom_method(pr_handler, mock_api):
@@ -329,6 +885,7 @@ def test_merge_pr_with_custom_method(pr_handler, mock_api):
     all_checks = MyFakeResponse(
         200,
         {
+            "total_count": 1,
             "check_runs": [
                 {
                     "name": "check-1",
@@ -342,15 +899,12 @@ def test_merge_pr_with_custom_method(pr_handler, mock_api):
 
     mock_responses = [
         MyFakeResponse(200, {"permission": "admin"}),
-        MyFakeResponse(200, {"head": {"sha": "abc123"}}),
-        all_checks,
         MyFakeResponse(200, {}),
         all_comments,
         MyFakeResponse(200, {"permission": "write"}),  # reviewer1
         MyFakeResponse(200, {"permission": "write"}),  # reviewer2
-        all_comments,
-        MyFakeResponse(200, {"permission": "write"}),  # reviewer1
-        MyFakeResponse(200, {"permission": "write"}),  # reviewer2
+        MyFakeResponse(200, {"head": {"sha": "abc123"}}),
+        all_checks,
     ]
 
     mock_api.get.side_effect = mock_responses
@@ -372,6 +926,44 @@ def test_merge_pr_with_custom_method(pr_handler, mock_api):
 
 
 def test_assign_unassign_pr_author(pr_handler):
-    with pytest.raises(SystemExit) as exc_info:
+    with pytest.raises(CommandError):
         pr_handler.assign_unassign("assign", ["test_user"])
-        assert exc_info == 1
+    pr_handler.api.post.assert_called_once()
+    assert pr_handler.api.post.call_args.args[0] == "issues/123/comments"
+
+
+def test_handle_merge_conflict(pr_handler, mock_api):
+    pr_handler._handle_merge_conflict("release-1.0", "abc123", 2, 3)
+
+    body = mock_api.post.call_args[0][1]["body"]
+    assert "cherry-picking PR #123 to release-1.0" in body
+    assert "Progress: 2/3 commits" in body
+    assert "resolve-cherry-pick-123" in body
+
+
+def test_perform_cherry_pick(pr_handler, mock_api):
+    mock_api.get.side_effect = routed(
+        {
+            "pulls/123/commits?per_page=100&page=1": MyFakeResponse(
+                200, [{"sha": "c1", "commit": {"message": "first"}}, {"sha": "c2"}]
+            ),
+            "git/refs/heads/release-1.0": MyFakeResponse(
+                200, {"object": {"sha": "base"}}
+            ),
+        }
+    )
+    mock_api.post.return_value = MyFakeResponse(201, {"sha": "picked"})
+
+    assert pr_handler._perform_cherry_pick("release-1.0") is True
+    merges = [c for c in mock_api.post.call_args_list if c[0][0] == "merges"]
+    assert [c[0][1]["head"] for c in merges] == ["c1", "c2"]
+    assert "Successfully cherry-picked" in mock_api.post.call_args[0][1]["body"]
+
+    # The commits are cached for the next branch
+    pr_handler._perform_cherry_pick("release-1.0")
+    commit_gets = [
+        c
+        for c in mock_api.get.call_args_list
+        if c[0][0].startswith("pulls/123/commits")
+    ]
+    assert len(commit_gets) == 1
@@ -2,7 +2,8 @@ import sys
 
 import pytest
 
-from boussole.boussole import PRHandler, main  # Import main and PRHandler
+from boussole.boussole import CommandError, PRHandler
+from boussole.cli import main
 
 
 # Dummy response to simulate successful API call.
@@ -33,10 +34,14 @@ def test_main_help_success(monkeypatch, capsys):
     def fake_post_comment(_, msg):
         # Verify that HELP_TEXT is being passed.
         assert "help" in msg.lower()
+        assert "at least 1 org members" in msg
         return dummy
 
     monkeypatch.setattr(PRHandler, "_post_comment", fake_post_comment)
-    monkeypatch.setattr(PRHandler, "check_status", lambda self, *_: True)
+    # The PR state is not needed to post the help
+    monkeypatch.setattr(
+        PRHandler, "check_status", lambda self, *_: pytest.fail("PR state fetched")
+    )
     monkeypatch.setattr(PRHandler, "check_response", lambda self, resp: True)
 
     # Set sys.argv with valid parameters and a trigger comment for "help".
@@ -118,3 +123,133 @@ def test_main_invalid_command(monkeypatch):
     with pytest.raises(SystemExit):
         main()
     assert exit_code == 1
+
+
+# Test that the command and its arguments are split out of the trigger comment.
+def test_main_dispatch_with_arguments(monkeypatch):
+    labels = []
+
+    def fake_label(_, values):
+        labels.extend(values)
+        return DummyResponse(200, "OK")
+
+    monkeypatch.setattr(PRHandler, "label", fake_label)
+    monkeypatch.setattr(PRHandler, "check_status", lambda self, *_: True)
+    monkeypatch.setattr(PRHandler, "check_response", lambda self, resp: True)
+
+    sys.argv = [
+        "prog",
+        "--github-token",
+        "token",
+        "--pr-num",
+        "1",
+        "--pr-sender",
+        "user",
+        "--comment-sender",
+        "admin",
+        "--repo-owner",
+        "owner",
+        "--repo-name",
+        "repo",
+        "--trigger-comment",
+        "/label bug  feature\n",
+    ]
+
+    main()
+    assert labels == ["bug", "feature"]
+
+
+# Test that the lines after the command are not taken as arguments.
+def test_main_dispatch_ignores_following_lines(monkeypatch):
+    reviewers = []
+
+    def fake_assign_unassign(_, command, values):
+        assert command == "assign"
+        reviewers.extend(values)
+        return DummyResponse(200, "OK")
+
+    monkeypatch.setattr(PRHandler, "assign_unassign", fake_assign_unassign)
+    monkeypatch.setattr(PRHandler, "check_status", lambda self, *_: True)
+    monkeypatch.setattr(PRHandler, "check_response", lambda self, resp: True)
+
+    sys.argv = [
+        "prog",
+        "--github-token",
+        "token",
+        "--pr-num",
+        "1",
+        "--pr-sender",
+        "user",
+        "--comment-sender",
+        "admin",
+        "--repo-owner",
+        "owner",
+        "--repo-name",
+        "repo",
+        "--trigger-comment",
+        "/assign user1\nThanks for looking!",
+    ]
+
+    main()
+    assert reviewers == ["user1"]
+
+
+# Test that errors raised by the handler are reported and exit with 1.
+def test_main_reports_handler_errors(monkeypatch, capsys):
+    def fake_cherry_pick(_, values):
+        raise CommandError(f"⚠️ Invalid number of arguments for cherry-pick: {values}")
+
+    monkeypatch.setattr(PRHandler, "cherry_pick", fake_cherry_pick)
+    monkeypatch.setattr(PRHandler, "check_status", lambda self, *_: True)
+
+    sys.argv = [
+        "prog",
+        "--github-token",
+        "token",
+        "--pr-num",
+        "1",
+        "--pr-sender",
+        "user",
+        "--comment-sender",
+        "admin",
+        "--repo-owner",
+        "owner",
+        "--repo-name",
+        "repo",
+        "--trigger-comment",
+        "/cherry-pick",
+    ]
+
+    with pytest.raises(SystemExit) as exc_info:
+        main()
+    assert exc_info.value.code == 1
+    assert "Invalid number of arguments" in capsys.readouterr().err
+
+
+# Test that a comment which is not a command exits cleanly.
+def test_main_not_a_command(monkeypatch, capsys):
+    monkeypatch.setattr(
+        PRHandler, "check_status", lambda self, *_: pytest.fail("no API call expected")
+    )
+    sys.argv = [
+        "prog",
+        "--github-token",
+        "token",
+        "--pr-num",
+        "1",
+        "--pr-sender",
+        "user",
+        "--comment-sender",
+        "admin",
+        "--repo-owner",
+        "owner",
+        "--repo-name",
+        "repo",
+        "--trigger-comment",
+        "Thanks for the review!",
+    ]
+
+    with pytest.raises(SystemExit) as exc_info:
+        main()
+    assert exc_info.value.code == 0
+    assert "No command found" in capsys.readouterr().out